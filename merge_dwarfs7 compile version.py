@@ -1,10 +1,36 @@
 import pygame
 import sys
 import random
-import copy # Needed for deep copying the game map
-import math # For distance calculation
+import numpy as np # Grid maps are stored as 2-D arrays
+import math # For viewport rounding
 import os # NEW: Import the os module
 
+# NEW: Numba is optional; without it the JIT-marked kernels simply run as plain Python.
+# It compiles the fluid step and the dwarf AI's map checks; digs, sounds and RNG stay in Python.
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# The on-disk JIT cache needs the module's source file, which a PyInstaller bundle doesn't ship
+NUMBA_CACHE = not getattr(sys, 'frozen', False)
+
+def njit(*args, **kwargs):
+    """Numba's njit when it is usable, otherwise returns the function unchanged."""
+    def decorate(func):
+        global HAVE_NUMBA
+        if not HAVE_NUMBA:
+            return func
+        try:
+            return numba.njit(**kwargs)(func)
+        except Exception: # e.g. no cache locator for this file; fall back to the NumPy path
+            HAVE_NUMBA = False
+            return func
+    if len(args) == 1 and callable(args[0]):
+        return decorate(args[0])
+    return decorate
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     try:
@@ -55,11 +81,22 @@ TILE_GOGGLES = 14
 TILE_ALE = 15
 TILE_PICKAXE = 16
 
+# NEW: Updated reward tiles (dwarves turn towards these)
+REWARD_TILES = frozenset({TILE_GOLD, TILE_PRESENT, TILE_CHEST, TILE_UPGRADE_LOOT, TILE_DWARF_LOOT})
+IS_REWARD_TILE = np.zeros(32, dtype=np.bool_) # NEW: Same set as a tile type -> bool lookup
+IS_REWARD_TILE[list(REWARD_TILES)] = True
+BLOCKING_TILES = frozenset({TILE_WALL, TILE_WATER_SOURCE, TILE_LAVA_SOURCE}) # Dwarves can't enter these
+IS_BLOCKING_TILE = np.zeros(32, dtype=np.bool_) # NEW: Same set as a lookup the compiled AI checks can use
+IS_BLOCKING_TILE[list(BLOCKING_TILES)] = True
+PICKAXE_FAST_TILES = frozenset({TILE_DIRT, TILE_CRACKED_DIRT}) # Dug at double speed with a pickaxe
+BUILDABLE_TILES = frozenset({TILE_EMPTY, TILE_DIRT, TILE_WATER, TILE_LAVA, TILE_HARD_DIRT, TILE_CRACKED_DIRT}) # Walls go here
+
 # Map Seeding Properties (Base values)
 BASE_TOTAL_CHESTS = 10
 BASE_TOTAL_WATER_POCKETS = 5
 BASE_TOTAL_LAVA_POCKETS = 3
 BASE_HARD_DIRT_RADIUS = 15
+POCKET_TILES = (TILE_DIRT, TILE_HARD_DIRT, TILE_CRACKED_DIRT) # Fluid pockets replace these
 
 GOLD_CHANCE = 0.09
 PRESENT_CHANCE = 0.01      # Now spawns a tool
@@ -74,6 +111,7 @@ TILE_FOG_REVEALED = 1
 # Colors (REMOVED game colors, kept UI colors)
 COLOR_GRID = (40, 40, 40)
 COLOR_FOG_HIDDEN = (0, 0, 0)
+GRID_COLORKEY = (255, 0, 255) # NEW: Transparent color of the grid overlay tile
 COLOR_UI_TEXT = (255, 255, 255)
 COLOR_UI_BACKGROUND = (20, 20, 20)
 
@@ -94,6 +132,11 @@ DWARF_REVEAL_RADIUS = 2
 DWARF_SPAWN_DELAY = 30000 # 30 seconds
 DROWN_TIME = 5000 # 5 seconds
 
+# NEW: Movement directions (up, down, left, right) and, for each one, the other three
+DWARF_DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+DIRECTIONS_EXCLUDING = {d: tuple(o for o in DWARF_DIRECTIONS if o != d) for d in DWARF_DIRECTIONS}
+NEIGHBORS_8 = DWARF_DIRECTIONS + ((-1, -1), (-1, 1), (1, -1), (1, 1)) # NEW: Plus the diagonals (cave-ins)
+
 # --- UI Properties ---
 UI_FONT = pygame.font.SysFont('Arial', 18)
 UI_FONT_CONTROLS = pygame.font.SysFont('Arial', 14)
@@ -127,6 +170,14 @@ MINIMAP_COLORS = {
     TILE_DWARF_LOOT: (255, 0, 100)  # NEW: Heart Color
 }
 DWARF_MINIMAP_COLOR = (255, 255, 255)
+MINIMAP_FLUID_TILES = [TILE_WATER, TILE_LAVA, TILE_WATER_SOURCE, TILE_LAVA_SOURCE] # These flash
+
+# NEW: Tile type -> minimap RGB lookup table (tiles without a color stay black)
+MINIMAP_LUT = np.zeros((32, 3), dtype=np.uint8)
+for tile_type, color in MINIMAP_COLORS.items():
+    MINIMAP_LUT[tile_type] = color
+MINIMAP_DIM_LUT = MINIMAP_LUT.copy() # NEW: Same table with fluids at half brightness (flash off)
+MINIMAP_DIM_LUT[MINIMAP_FLUID_TILES] //= 2
 
 # --- Game Timers & Costs ---
 FLUID_UPDATE_DELAY = 500
@@ -134,15 +185,28 @@ FLUID_LIFETIME = 3000
 WALL_COST = 1
 UPGRADE_COSTS = [10, 20, 30, 40, 999]
 WARNING_DURATION = 3000 # 3 seconds
+FLUID_FRONTIER_PYTHON_TILES = 256 # NEW: Without Numba, bigger fluid frontiers use the whole-map NumPy step
+WARNING_RADIUS_STEPS = 16 # NEW: Flood warning rings are pre-rendered at this many sizes per zoom level...
+WARNING_ALPHA_STEPS = 8 # NEW: ...times this many fade levels
+ZOOM_RESCALE_DELAY = 100 # NEW: ms after the last zoom step before sprites are re-scaled
+TERRAIN_CHUNK_PIXELS = 512 # NEW: Target side length of one lazily baked terrain chunk
+MAX_TERRAIN_CHUNKS = 24 # NEW: Cached chunks (~1MB each) kept before off-screen ones are dropped
 
 # --- Asset Loading ---
 SPRITESHEET_FILE = 'spritesheet.png'
 script_dir = os.path.dirname(__file__)
 spritesheet_path = resource_path(SPRITESHEET_FILE)
 
+sprite_sheet = None # NEW: The loaded sheet, kept so it can be scaled as a whole
 sprite_library = {} # Dictionary to hold our sliced sprites
 sprite_cache = {} # NEW: Holds scaled sprites for current zoom
+sprite_cache_opaque = {} # NEW: Fastest-blitting version of each scaled sprite (no alpha channel if opaque)
 previous_zoom_level = -1 # NEW: Used to detect zoom changes
+scaled_sprite_sets = {} # NEW: Tile size -> (sprite_cache, sprite_cache_opaque, terrain LUT, loot LUT)
+
+opaque_sprite_keys = set() # NEW: Sprites with no transparent pixels, found at load time
+terrain_sprite_lut = [None] * 32 # NEW: Tile type -> scaled floor sprite, rebuilt with sprite_cache
+loot_sprite_lut = [None] * 32 # NEW: Tile type -> scaled loot sprite drawn over the floor
 
 sound_library = {} # NEW: Dictionary for loaded sounds
 
@@ -151,8 +215,60 @@ def play_sound(sound_name):
     if sound_name in sound_library:
         sound_library[sound_name].play()
 
+# NEW: (column, row) of each sprite on the sheet, in TILE_SIZE cells
+SPRITE_LAYOUT = {
+    # Row 0 (y=0): Terrain
+    'TILE_EMPTY': (0, 0),
+    'TILE_DIRT': (1, 0),
+    'TILE_HARD_DIRT': (2, 0),
+    'TILE_WALL': (3, 0),
+    'TILE_GOLD': (4, 0),
+    'TILE_CHEST': (5, 0),
+    'TILE_PRESENT': (6, 0),
+    'TILE_UPGRADE_LOOT': (7, 0), # Star
+    'TILE_DWARF_LOOT': (8, 0), # Heart
+
+    # Row 1 (y=20): Fluids & Tools
+    'TILE_WATER': (0, 1),
+    'TILE_LAVA': (1, 1),
+    'TILE_WATER_SOURCE': (2, 1),
+    'TILE_LAVA_SOURCE': (3, 1),
+    'TILE_CRACKED_DIRT': (4, 1), # Moved
+    'TILE_GOGGLES': (5, 1), # New
+    'TILE_ALE': (6, 1), # New
+    'TILE_PICKAXE': (7, 1), # New
+
+    # Row 2 (y=40): Dwarves
+    'DWARF_L1': (0, 2),
+    'DWARF_L2': (1, 2),
+    'DWARF_L3': (2, 2),
+    'DWARF_L4': (3, 2),
+    'DWARF_L5': (4, 2),
+
+    # Row 3 (y=60): Arrows
+    'ARROW_UP': (0, 3),
+    'ARROW_RIGHT': (1, 3),
+    'ARROW_DOWN': (2, 3),
+    'ARROW_LEFT': (3, 3),
+}
+
+# NEW: Sprite key for each tile type's floor and loot layers. Loot tiles have no fixed
+# floor (dirt or hard dirt depending on the ring), everything else unlisted draws as empty.
+TERRAIN_SPRITE_KEYS = ['TILE_EMPTY'] * 32
+for tile_type, key in ((TILE_DIRT, 'TILE_DIRT'), (TILE_HARD_DIRT, 'TILE_HARD_DIRT'),
+                       (TILE_CRACKED_DIRT, 'TILE_CRACKED_DIRT'), (TILE_WALL, 'TILE_WALL'),
+                       (TILE_WATER, 'TILE_WATER'), (TILE_LAVA, 'TILE_LAVA'),
+                       (TILE_WATER_SOURCE, 'TILE_WATER_SOURCE'), (TILE_LAVA_SOURCE, 'TILE_LAVA_SOURCE')):
+    TERRAIN_SPRITE_KEYS[tile_type] = key
+LOOT_SPRITE_KEYS = [None] * 32
+for tile_type, key in ((TILE_GOLD, 'TILE_GOLD'), (TILE_PRESENT, 'TILE_PRESENT'), (TILE_CHEST, 'TILE_CHEST'),
+                       (TILE_UPGRADE_LOOT, 'TILE_UPGRADE_LOOT'), (TILE_DWARF_LOOT, 'TILE_DWARF_LOOT')):
+    TERRAIN_SPRITE_KEYS[tile_type] = None
+    LOOT_SPRITE_KEYS[tile_type] = key
+
 def load_spritesheet():
     """Loads and slices the spritesheet into the sprite_library."""
+    global sprite_sheet
     try:
         sheet = pygame.image.load(spritesheet_path).convert_alpha()
     except pygame.error as e:
@@ -160,63 +276,58 @@ def load_spritesheet():
         print(e)
         pygame.quit()
         sys.exit()
-
-    # --- NEW: Updated Sprite Layout based on image_c58059.png ---
-    
-    # Row 0 (y=0): Terrain
-    sprite_library['TILE_EMPTY'] = sheet.subsurface((0*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_DIRT'] = sheet.subsurface((1*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_HARD_DIRT'] = sheet.subsurface((2*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_WALL'] = sheet.subsurface((3*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_GOLD'] = sheet.subsurface((4*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_CHEST'] = sheet.subsurface((5*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_PRESENT'] = sheet.subsurface((6*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_UPGRADE_LOOT'] = sheet.subsurface((7*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)) # Star
-    sprite_library['TILE_DWARF_LOOT'] = sheet.subsurface((8*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)) # Heart
-    
-    # Row 1 (y=20): Fluids & Tools
-    sprite_library['TILE_WATER'] = sheet.subsurface((0*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_LAVA'] = sheet.subsurface((1*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_WATER_SOURCE'] = sheet.subsurface((2*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_LAVA_SOURCE'] = sheet.subsurface((3*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['TILE_CRACKED_DIRT'] = sheet.subsurface((4*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE)) # Moved
-    sprite_library['TILE_GOGGLES'] = sheet.subsurface((5*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE)) # New
-    sprite_library['TILE_ALE'] = sheet.subsurface((6*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE)) # New
-    sprite_library['TILE_PICKAXE'] = sheet.subsurface((7*TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE)) # New
-    
-    # Row 2 (y=40): Dwarves
-    sprite_library['DWARF_L1'] = sheet.subsurface((0*TILE_SIZE, 2*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['DWARF_L2'] = sheet.subsurface((1*TILE_SIZE, 2*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['DWARF_L3'] = sheet.subsurface((2*TILE_SIZE, 2*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['DWARF_L4'] = sheet.subsurface((3*TILE_SIZE, 2*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['DWARF_L5'] = sheet.subsurface((4*TILE_SIZE, 2*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    
-    # Row 3 (y=60): Arrows
-    sprite_library['ARROW_UP'] = sheet.subsurface((0*TILE_SIZE, 3*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['ARROW_RIGHT'] = sheet.subsurface((1*TILE_SIZE, 3*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['ARROW_DOWN'] = sheet.subsurface((2*TILE_SIZE, 3*TILE_SIZE, TILE_SIZE, TILE_SIZE))
-    sprite_library['ARROW_LEFT'] = sheet.subsurface((3*TILE_SIZE, 3*TILE_SIZE, TILE_SIZE, TILE_SIZE))
+    sprite_sheet = sheet
+
+    # --- NEW: Updated Sprite Layout based on image_c58059.png (see SPRITE_LAYOUT) ---
+    for key, (col, row) in SPRITE_LAYOUT.items():
+        # NEW: Standalone copies, so blitting a sprite never locks the whole sheet
+        sprite_library[key] = sheet.subsurface((col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)).copy()
+        # NEW: Fully opaque sprites can skip per-pixel alpha blending
+        if pygame.surfarray.array_alpha(sprite_library[key]).min() == 255:
+            opaque_sprite_keys.add(key)
     
     print("Spritesheet loaded and sliced successfully.")
 
 def scale_sprites(zoom):
     """NEW: Re-scales all sprites and stores them in sprite_cache."""
-    global sprite_cache, previous_zoom_level
+    global sprite_cache, sprite_cache_opaque, previous_zoom_level, terrain_sprite_lut, loot_sprite_lut
     
     current_tile_size = int(TILE_SIZE * zoom)
     if current_tile_size == previous_zoom_level:
         return # No change, cache is still valid
+    if current_tile_size in scaled_sprite_sets:
+        # NEW: Zooming back to a size we've seen reuses its sprites
+        sprite_cache, sprite_cache_opaque, terrain_sprite_lut, loot_sprite_lut = scaled_sprite_sets[current_tile_size]
+        previous_zoom_level = current_tile_size
+        return
         
     if current_tile_size <= 0:
         sprite_cache = {} # Zoomed out too far to draw
+        sprite_cache_opaque = {}
+        terrain_sprite_lut = [None] * 32
+        loot_sprite_lut = [None] * 32
         return
 
+    # NEW: Scale the whole sheet in one call, then slice it like load_spritesheet() does
+    sheet_cols = sprite_sheet.get_width() // TILE_SIZE
+    sheet_rows = sprite_sheet.get_height() // TILE_SIZE
+    whole_tiles = sprite_sheet.subsurface((0, 0, sheet_cols * TILE_SIZE, sheet_rows * TILE_SIZE))
+    scaled_sheet = pygame.transform.scale(whole_tiles, (sheet_cols * current_tile_size, sheet_rows * current_tile_size))
+
     sprite_cache = {} # Clear old cache
-    for key, sprite in sprite_library.items():
-        try:
-            sprite_cache[key] = pygame.transform.scale(sprite, (current_tile_size, current_tile_size))
-        except ValueError: # Can happen if current_tile_size is 0
-            pass 
+    sprite_cache_opaque = {}
+    for key, (col, row) in SPRITE_LAYOUT.items():
+        scaled_sprite = scaled_sheet.subsurface((col * current_tile_size, row * current_tile_size,
+                                                 current_tile_size, current_tile_size))
+        # Match the display pixel format so blits don't convert per call
+        sprite_cache[key] = scaled_sprite.convert_alpha()
+        if key in opaque_sprite_keys:
+            sprite_cache_opaque[key] = scaled_sprite.convert()
+        else:
+            sprite_cache_opaque[key] = sprite_cache[key] # Needs its alpha channel
+    terrain_sprite_lut = [sprite_cache_opaque.get(key) for key in TERRAIN_SPRITE_KEYS]
+    loot_sprite_lut = [sprite_cache.get(key) for key in LOOT_SPRITE_KEYS]
+    scaled_sprite_sets[current_tile_size] = (sprite_cache, sprite_cache_opaque, terrain_sprite_lut, loot_sprite_lut)
     
     previous_zoom_level = current_tile_size
 
@@ -266,6 +377,35 @@ def world_to_screen(world_x, world_y):
     screen_y = (world_y * zoom_level) - camera_y
     return int(screen_x), int(screen_y)
 
+def get_warning_surface(radius, alpha, tile_size, line_width):
+    """NEW: Returns a cached flood warning ring, snapped to one of the quantized radius/alpha steps.
+
+    alpha is the fraction of the warning left (1 -> 0); the ring is centred on its surface.
+    """
+    global warning_cache_tile_size
+    if tile_size != warning_cache_tile_size: # Radius steps are per zoom level, so old rings are useless
+        warning_surface_cache.clear()
+        warning_cache_tile_size = tile_size
+    
+    radius_step = max(1, math.ceil(3 * tile_size / WARNING_RADIUS_STEPS)) # Rings grow to 3 tiles
+    radius_idx = max(1, round(radius / radius_step))
+    alpha_idx = min(int(alpha * WARNING_ALPHA_STEPS), WARNING_ALPHA_STEPS - 1)
+    key = (radius_idx, alpha_idx)
+    warning_surface = warning_surface_cache.get(key)
+    if warning_surface is None:
+        drawn_radius = radius_idx * radius_step
+        drawn_alpha = (alpha_idx + 1) * 200 // WARNING_ALPHA_STEPS
+        warning_surface = pygame.Surface((drawn_radius * 2, drawn_radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(warning_surface, (255, 0, 0, drawn_alpha), (drawn_radius, drawn_radius), drawn_radius, line_width)
+        warning_surface_cache[key] = warning_surface
+    return warning_surface
+
+def world_to_screen_arrays(world_xs, world_ys):
+    """NEW: world_to_screen() for whole arrays of world coordinates at once."""
+    screen_xs = ((world_xs * zoom_level) - camera_x).astype(np.int64) # Truncates like int()
+    screen_ys = ((world_ys * zoom_level) - camera_y).astype(np.int64)
+    return screen_xs, screen_ys
+
 def screen_to_world(screen_x, screen_y):
     """Converts on-screen pixel coordinates to game world pixel coordinates."""
     world_x = (screen_x + camera_x) / zoom_level
@@ -335,9 +475,153 @@ class Arrow:
         surface.blit(scaled_sprite, (screen_x, screen_y))
 
 
+# --- Flood Warning Storage ---
+class FloodWarnings:
+    """NEW: Parallel x / y / expiry arrays for the active flood warnings, oldest first."""
+
+    def __init__(self, capacity=64):
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.expiry = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, floods):
+        """Appends (x, y, expiry_time) warnings, growing the arrays if needed."""
+        if not floods:
+            return
+        new_count = self.count + len(floods)
+        if new_count > len(self.x):
+            capacity = max(new_count, 2 * len(self.x))
+            for name in ('x', 'y', 'expiry'):
+                grown = np.zeros(capacity, dtype=getattr(self, name).dtype)
+                grown[:self.count] = getattr(self, name)[:self.count]
+                setattr(self, name, grown)
+        self.x[self.count:new_count], self.y[self.count:new_count], self.expiry[self.count:new_count] = zip(*floods)
+        self.count = new_count
+
+    def expire(self, current_time):
+        """Drops finished warnings in place, keeping the rest in order."""
+        active = self.expiry[:self.count] > current_time
+        kept = int(np.count_nonzero(active))
+        if kept < self.count:
+            for values in (self.x, self.y, self.expiry):
+                values[:kept] = values[:self.count][active]
+            self.count = kept
+
+
+# --- Dwarf Storage ---
+class DwarfPool:
+    """NEW: Structure-of-arrays storage for the dwarf fields the game loop reads every frame.
+
+    Each Dwarf owns one slot; its hot attributes are properties that index these arrays,
+    so whole-squad checks (who needs an update this frame) run as single NumPy operations.
+    """
+    FIELDS = {
+        'x': np.int32, 'y': np.int32, 'dx': np.int8, 'dy': np.int8,
+        'level': np.int8, 'alive': np.bool_, 'last_move_time': np.int64,
+        'base_move_delay': np.int32, 'is_in_water': np.bool_,
+        'has_pickaxe': np.bool_, 'has_goggles': np.bool_, 'has_ale': np.bool_,
+    }
+
+    def __init__(self, capacity=64):
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+    def allocate(self):
+        if not self.free_slots:
+            self.grow()
+        slot = self.free_slots.pop()
+        for name in self.FIELDS:
+            getattr(self, name)[slot] = 0
+        return slot
+
+    def release(self, slot):
+        self.alive[slot] = False
+        self.free_slots.append(slot)
+
+    def grow(self):
+        old_capacity = len(self.alive)
+        for name in self.FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros_like(getattr(self, name))]))
+        self.free_slots.extend(range(2 * old_capacity - 1, old_capacity - 1, -1))
+
+    def needs_update(self, game_map, current_time):
+        """Mask of slots whose Dwarf.update() can change anything this frame.
+
+        A dwarf that isn't due to move and isn't in (or just out of) water would only
+        re-check its timers, so it is skipped. The move check uses the pickaxe's halved
+        delay for every pickaxe holder, since the tile ahead can change mid-frame.
+        """
+        on_water = game_map[self.y, self.x] == TILE_WATER
+        min_delay = np.where(self.has_pickaxe, self.base_move_delay // 2, self.base_move_delay)
+        ready = (current_time - self.last_move_time) > min_delay
+        return self.alive & (ready | on_water | self.is_in_water)
+
+    def shared_tile_mask(self, map_width):
+        """Mask of live slots standing on the same tile as another live dwarf (merge candidates)."""
+        tile_keys = self.y.astype(np.int64) * map_width + self.x
+        live_keys, key_counts = np.unique(tile_keys[self.alive], return_counts=True)
+        return self.alive & np.isin(tile_keys, live_keys[key_counts > 1])
+
+def _pool_field(name):
+    """NEW: Property that reads/writes this dwarf's slot in its DwarfPool."""
+    def get(self):
+        return getattr(self.pool, name)[self.slot].item()
+    def set(self, value):
+        getattr(self.pool, name)[self.slot] = value
+    return property(get, set)
+
+# --- Dwarf AI Kernel ---
+DWARF_TARGET_OPEN = 4 # NEW: scan_dwarf_tiles() results after the four reward directions
+DWARF_TARGET_BLOCKED = 5
+
+@njit(cache=NUMBA_CACHE)
+def scan_dwarf_tiles(game_map, x, y, dx, dy, level, has_pickaxe):
+    """NEW: The dwarf AI's map-only checks, compiled when Numba is available.
+
+    Returns the index into DWARF_DIRECTIONS of the first adjacent reward tile, otherwise
+    DWARF_TARGET_BLOCKED or DWARF_TARGET_OPEN for the tile ahead at (x + dx, y + dy).
+    """
+    height, width = game_map.shape
+    for direction in range(len(DWARF_DIRECTIONS)):
+        nx = x + DWARF_DIRECTIONS[direction][0]
+        ny = y + DWARF_DIRECTIONS[direction][1]
+        if 0 <= nx < width and 0 <= ny < height and IS_REWARD_TILE[game_map[ny, nx]]:
+            return direction
+    
+    target_x, target_y = x + dx, y + dy
+    if not (0 <= target_x < width) or not (0 <= target_y < height):
+        return DWARF_TARGET_BLOCKED # Map boundary
+    target_tile = game_map[target_y, target_x]
+    if IS_BLOCKING_TILE[target_tile]:
+        return DWARF_TARGET_BLOCKED
+    # Pickaxe check
+    if target_tile == TILE_HARD_DIRT and level < MIN_LEVEL_FOR_HARD_DIRT and not has_pickaxe:
+        return DWARF_TARGET_BLOCKED
+    return DWARF_TARGET_OPEN
+
 # --- Dwarf Class ---
 class Dwarf:
+    x = _pool_field('x')
+    y = _pool_field('y')
+    dx = _pool_field('dx')
+    dy = _pool_field('dy')
+    level = _pool_field('level')
+    alive = _pool_field('alive')
+    last_move_time = _pool_field('last_move_time')
+    base_move_delay = _pool_field('base_move_delay')
+    is_in_water = _pool_field('is_in_water')
+    has_pickaxe = _pool_field('has_pickaxe')
+    has_goggles = _pool_field('has_goggles')
+    has_ale = _pool_field('has_ale')
+
     def __init__(self, x, y, level=1):
+        self.pool = dwarf_pool
+        self.slot = dwarf_pool.allocate()
         self.x = x
         self.y = y
         self.level = 0
@@ -369,66 +653,40 @@ class Dwarf:
         self.move_delay = self.base_move_delay
 
     def pick_random_direction(self, exclude_dir=None):
-        directions = [(0, -1, 'up'), (0, 1, 'down'), (-1, 0, 'left'), (1, 0, 'right')]
-        
-        if exclude_dir:
-            directions = [d for d in directions if (d[0], d[1]) != exclude_dir]
-        
-        if not directions:
-            directions = [(0, -1, 'up'), (0, 1, 'down'), (-1, 0, 'left'), (1, 0, 'right')]
-            
-        choice = random.choice(directions)
-        self.dx, self.dy = choice[0], choice[1]
+        # NEW: Precomputed choices; anything that isn't a direction excludes nothing
+        directions = DIRECTIONS_EXCLUDING.get(exclude_dir, DWARF_DIRECTIONS)
+        self.dx, self.dy = random.choice(directions)
 
     def draw(self, surface, screen_x, screen_y, scaled_sprite):
         """NEW: Draws the dwarf at a calculated screen position."""
         surface.blit(scaled_sprite, (screen_x, screen_y))
         
-    def is_target_blocked(self, new_x, new_y, game_map):
-        """Helper to check if a tile is passable."""
-        if not (0 <= new_x < MAP_WIDTH) or not (0 <= new_y < MAP_HEIGHT):
-            return True # Map boundary
-            
-        target_tile = game_map[new_y][new_x]
-        
-        if target_tile in [TILE_WALL, TILE_WATER_SOURCE, TILE_LAVA_SOURCE]:
-            return True
+    def find_adjacent_reward(self, tile_event, dwarf_index):
+        """AI: Look for adjacent rewards and turn towards them.
+
+        tile_event is this dwarf's scan_dwarf_tiles() result, which already found any reward tile.
+        """
+        if tile_event < len(DWARF_DIRECTIONS):
+            self.dx, self.dy = DWARF_DIRECTIONS[tile_event]
+            return True # Found a reward
         
-        # NEW: Pickaxe check
-        if target_tile == TILE_HARD_DIRT and self.level < MIN_LEVEL_FOR_HARD_DIRT and not self.has_pickaxe:
-            return True
-            
-        return False
-
-    def find_adjacent_reward(self, game_map, dwarf_list):
-        """AI: Look for adjacent rewards and turn towards them."""
-        # NEW: Updated reward tiles
-        REWARD_TILES = [TILE_GOLD, TILE_PRESENT, TILE_CHEST, TILE_UPGRADE_LOOT, TILE_DWARF_LOOT]
-        
-        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-            nx, ny = self.x + dx, self.y + dy
-            if (0 <= nx < MAP_WIDTH) and (0 <= ny < MAP_HEIGHT):
-                if game_map[ny][nx] in REWARD_TILES:
+        x, y = self.x, self.y
+        for dx, dy in DWARF_DIRECTIONS:
+            for other_dwarf in dwarf_index.get((x + dx, y + dy), ()):
+                if other_dwarf.alive and other_dwarf.level == self.level:
                     self.dx, self.dy = dx, dy
-                    return True # Found a reward
-        
-        for other_dwarf in dwarf_list:
-            if other_dwarf is not self and other_dwarf.alive and other_dwarf.level == self.level:
-                for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-                    if self.x + dx == other_dwarf.x and self.y + dy == other_dwarf.y:
-                        self.dx, self.dy = dx, dy
-                        return True # Found a merge
+                    return True # Found a merge
         
         return False # No adjacent reward
 
-    def move(self, game_map, fog_map, dwarf_list):
+    def move(self, game_map, fog_map, dwarf_index):
         new_x = self.x + self.dx
         new_y = self.y + self.dy
 
         if not (0 <= new_x < MAP_WIDTH) or not (0 <= new_y < MAP_HEIGHT):
             return None
 
-        target_tile_type = game_map[new_y][new_x]
+        target_tile_type = game_map[new_y, new_x]
         
         if target_tile_type == TILE_LAVA:
             self.alive = False
@@ -439,13 +697,20 @@ class Dwarf:
         if target_tile_type == TILE_HARD_DIRT and self.level < MIN_LEVEL_FOR_HARD_DIRT and not self.has_pickaxe:
             return None # Blocked
         
-        if target_tile_type in [TILE_WALL, TILE_WATER_SOURCE, TILE_LAVA_SOURCE]:
+        if target_tile_type in BLOCKING_TILES:
             return None
         
-        for other_dwarf in dwarf_list:
-            if other_dwarf is not self and other_dwarf.x == new_x and other_dwarf.y == new_y:
-                if other_dwarf.level != self.level:
-                    return None
+        for other_dwarf in dwarf_index.get((new_x, new_y), ()):
+            if other_dwarf is not self and other_dwarf.level != self.level:
+                return None
+
+        # Keep the position index in sync for dwarves updated after us
+        old_cell = dwarf_index.get((self.x, self.y))
+        if old_cell and self in old_cell:
+            old_cell.remove(self)
+            if not old_cell:
+                del dwarf_index[(self.x, self.y)]
+        dwarf_index.setdefault((new_x, new_y), []).append(self)
 
         self.x = new_x
         self.y = new_y
@@ -466,26 +731,28 @@ class Dwarf:
             reward = 'cracked_dirt'
 
         if target_tile_type != TILE_EMPTY and target_tile_type != TILE_WATER:
-            game_map[self.y][self.x] = TILE_EMPTY
+            game_map[self.y, self.x] = TILE_EMPTY
+            dirty_tiles.add((self.x, self.y))
+            wake_fluids(self.x, self.y)
             
         self.reveal_surroundings(fog_map)
         
         return reward
 
-    def check_for_arrow(self, arrow_list):
-        for arrow in arrow_list:
-            if self.x == arrow.x and self.y == arrow.y:
-                self.dx = arrow.dx
-                self.dy = arrow.dy
-                return True
+    def check_for_arrow(self, arrow_index):
+        arrow = arrow_index.get((self.x, self.y))
+        if arrow is not None:
+            self.dx = arrow.dx
+            self.dy = arrow.dy
+            return True
         return False
         
-    def update(self, game_map, fog_map, arrow_list, dwarf_list, current_time):
+    def update(self, game_map, fog_map, arrow_index, dwarf_index, current_time):
         if not self.alive:
             return None
         
         # --- NEW: Ale (Drowning) Logic ---
-        current_tile = game_map[self.y][self.x]
+        current_tile = game_map[self.y, self.x]
         if current_tile == TILE_WATER:
             if not self.is_in_water:
                 self.is_in_water = True
@@ -508,9 +775,9 @@ class Dwarf:
         current_move_delay = self.base_move_delay
         target_x, target_y = self.x + self.dx, self.y + self.dy
         if (0 <= target_x < MAP_WIDTH) and (0 <= target_y < MAP_HEIGHT):
-            target_tile = game_map[target_y][target_x]
+            target_tile = game_map[target_y, target_x]
             # Fast digging for dirt
-            if self.has_pickaxe and target_tile in [TILE_DIRT, TILE_CRACKED_DIRT]:
+            if self.has_pickaxe and target_tile in PICKAXE_FAST_TILES:
                 current_move_delay = self.base_move_delay // 2
             # Normal speed for hard dirt (but still possible)
             elif self.has_pickaxe and target_tile == TILE_HARD_DIRT:
@@ -519,18 +786,19 @@ class Dwarf:
         if current_time - self.last_move_time > current_move_delay: # Use dynamic speed
             
             # --- AI Logic Priority ---
-            has_arrow = self.check_for_arrow(arrow_list)
+            has_arrow = self.check_for_arrow(arrow_index)
             
             has_reward = False
             if not has_arrow:
-                has_reward = self.find_adjacent_reward(game_map, dwarf_list)
+                tile_event = scan_dwarf_tiles(game_map, self.x, self.y, self.dx, self.dy,
+                                              self.level, self.has_pickaxe)
+                has_reward = self.find_adjacent_reward(tile_event, dwarf_index)
 
-            if not has_arrow and not has_reward:
-                if self.is_target_blocked(target_x, target_y, game_map):
+                if not has_reward and tile_event == DWARF_TARGET_BLOCKED:
                     self.pick_random_direction(exclude_dir=(-self.dx, -self.dy))
 
             if self.dx != 0 or self.dy != 0:
-                reward = self.move(game_map, fog_map, dwarf_list)
+                reward = self.move(game_map, fog_map, dwarf_index)
                 
             self.last_move_time = current_time
             
@@ -540,13 +808,14 @@ class Dwarf:
         # NEW: Goggles check
         radius = DWARF_REVEAL_RADIUS * 2 if self.has_goggles else DWARF_REVEAL_RADIUS
         
-        for r in range(-radius, radius + 1):
-            for c in range(-radius, radius + 1):
-                map_x = self.x + c
-                map_y = self.y + r
-                
-                if (0 <= map_x < MAP_WIDTH) and (0 <= map_y < MAP_HEIGHT):
-                    fog_map[map_y][map_x] = TILE_FOG_REVEALED
+        # NEW: Reveal the clipped square with one slice instead of a per-tile loop
+        y0, y1 = max(0, self.y - radius), min(MAP_HEIGHT, self.y + radius + 1)
+        x0, x1 = max(0, self.x - radius), min(MAP_WIDTH, self.x + radius + 1)
+        area = fog_map[y0:y1, x0:x1]
+        hidden_rows, hidden_cols = np.nonzero(area != TILE_FOG_REVEALED)
+        if len(hidden_rows):
+            area[...] = TILE_FOG_REVEALED
+            dirty_tiles.update(zip((hidden_cols + x0).tolist(), (hidden_rows + y0).tolist()))
 
 # --- Game Functions ---
 
@@ -554,12 +823,15 @@ def setup_level(level_number):
     """
     Generates a new level and resets all game state variables.
     """
-    global game_map, fog_map, fluid_lifetime_map, arrow_list, dwarf_list
+    global game_map, fog_map, fluid_lifetime_map, arrow_list, arrow_index, dwarf_list, dwarf_pool
+    global fluid_spare_map, fluid_spare_lifetimes, fluid_visited_map, fluid_connected_map
+    global fluid_active_map, fluid_frontier_pending, fluid_reconnect_needed
     global gold_count, chests_found, current_upgrade_level, game_over, win_state
     global last_dwarf_spawn_time, last_fluid_update_time, flood_warnings
     global MAP_WIDTH, MAP_HEIGHT, TOTAL_CHESTS, TOTAL_WATER_POCKETS, TOTAL_LAVA_POCKETS
-    global SPAWN_POINT_X, SPAWN_POINT_Y, HARD_DIRT_RADIUS
+    global SPAWN_POINT_X, SPAWN_POINT_Y, HARD_DIRT_RADIUS, HARD_DIRT_RADIUS_SQ, is_hard_ring
     global minimap_surface, minimap_pixel_size_x, minimap_pixel_size_y
+    global minimap_bright_surface, minimap_dim_surface, minimap_col_index, minimap_row_index, minimap_dirty
 
     # --- 1. Calculate new level properties ---
     level_modifier = level_number - 1
@@ -572,70 +844,82 @@ def setup_level(level_number):
     SPAWN_POINT_X = MAP_WIDTH // 2
     SPAWN_POINT_Y = MAP_HEIGHT // 2
     HARD_DIRT_RADIUS = BASE_HARD_DIRT_RADIUS + level_modifier
+    HARD_DIRT_RADIUS_SQ = HARD_DIRT_RADIUS * HARD_DIRT_RADIUS # Compared against squared distances, no sqrt
 
     # --- 2. Create Minimap Surface & Scaling ---
     minimap_surface = pygame.Surface((MINIMAP_WIDTH, MINIMAP_HEIGHT), pygame.SRCALPHA)
     minimap_pixel_size_x = MINIMAP_WIDTH / MAP_WIDTH
     minimap_pixel_size_y = MINIMAP_HEIGHT / MAP_HEIGHT
     
+    minimap_bright_surface = pygame.Surface((MINIMAP_WIDTH, MINIMAP_HEIGHT), pygame.SRCALPHA)
+    minimap_bright_surface.set_alpha(None) # Blits as a straight copy, alpha included
+    minimap_dim_surface = pygame.Surface((MINIMAP_WIDTH, MINIMAP_HEIGHT), pygame.SRCALPHA)
+    minimap_dim_surface.set_alpha(None) # Same tiles with fluids dimmed, for the flash-off phase
+    minimap_col_index = minimap_tile_index(MINIMAP_WIDTH, MAP_WIDTH, minimap_pixel_size_x)
+    minimap_row_index = minimap_tile_index(MINIMAP_HEIGHT, MAP_HEIGHT, minimap_pixel_size_y)
+    minimap_dirty = True
+    
     # --- 3. Generate Game Map ---
-    game_map = []
-    for row in range(MAP_HEIGHT):
-        new_row = []
-        for col in range(MAP_WIDTH):
-            tile_to_add = TILE_DIRT
-            if (abs(col - SPAWN_POINT_X) > 5) or (abs(row - SPAWN_POINT_Y) > 5):
-                rand_val = random.random()
-                # NEW: Updated chances
-                if rand_val < DWARF_LOOT_CHANCE:
-                    tile_to_add = TILE_DWARF_LOOT # Heart (L1 Spawn)
-                elif rand_val < (DWARF_LOOT_CHANCE + UPGRADE_LOOT_CHANCE):
-                    tile_to_add = TILE_UPGRADE_LOOT # Star (Mass Upgrade)
-                elif rand_val < (DWARF_LOOT_CHANCE + UPGRADE_LOOT_CHANCE + PRESENT_CHANCE):
-                    tile_to_add = TILE_PRESENT # Tool Box
-                elif rand_val < (DWARF_LOOT_CHANCE + UPGRADE_LOOT_CHANCE + PRESENT_CHANCE + GOLD_CHANCE):
-                    tile_to_add = TILE_GOLD
-            new_row.append(tile_to_add)
-        game_map.append(new_row)
+    yy, xx = np.ogrid[:MAP_HEIGHT, :MAP_WIDTH]
+    outside_spawn = (np.abs(xx - SPAWN_POINT_X) > 5) | (np.abs(yy - SPAWN_POINT_Y) > 5)
+    rand_vals = np.random.random((MAP_HEIGHT, MAP_WIDTH))
+
+    # NEW: Updated chances (cumulative, first match wins)
+    heart_limit = DWARF_LOOT_CHANCE
+    star_limit = heart_limit + UPGRADE_LOOT_CHANCE
+    present_limit = star_limit + PRESENT_CHANCE
+    gold_limit = present_limit + GOLD_CHANCE
+    loot_tiles = np.select(
+        [rand_vals < heart_limit, rand_vals < star_limit, rand_vals < present_limit, rand_vals < gold_limit],
+        [TILE_DWARF_LOOT, TILE_UPGRADE_LOOT, TILE_PRESENT, TILE_GOLD], # Heart, Star, Tool Box, Gold
+        default=TILE_DIRT)
+    game_map = np.where(outside_spawn, loot_tiles, TILE_DIRT).astype(np.uint8)
 
     # --- Add Hard Dirt ---
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            if game_map[y][x] == TILE_DIRT:
-                distance = math.sqrt((x - SPAWN_POINT_X)**2 + (y - SPAWN_POINT_Y)**2)
-                if distance > HARD_DIRT_RADIUS:
-                    game_map[y][x] = TILE_HARD_DIRT
-    
+    distance_sq = (xx - SPAWN_POINT_X)**2 + (yy - SPAWN_POINT_Y)**2
+    is_hard_ring = distance_sq > HARD_DIRT_RADIUS_SQ # NEW: Kept for drawing the floor under loot
+    game_map[(game_map == TILE_DIRT) & is_hard_ring] = TILE_HARD_DIRT
+
     # --- Add Cracked Dirt ---
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            if game_map[y][x] in [TILE_DIRT, TILE_HARD_DIRT]:
-                if random.random() < CRACKED_DIRT_CHANCE:
-                    game_map[y][x] = TILE_CRACKED_DIRT
-                    
-    # --- Seed Chests ---
-    chests_placed = 0
-    while chests_placed < TOTAL_CHESTS:
-        rand_x = random.randint(0, MAP_WIDTH - 1)
-        rand_y = random.randint(0, MAP_HEIGHT - 1)
-        if (game_map[rand_y][rand_x] in [TILE_HARD_DIRT, TILE_CRACKED_DIRT]):
-            game_map[rand_y][rand_x] = TILE_CHEST
-            chests_placed += 1
+    crack_mask = np.isin(game_map, [TILE_DIRT, TILE_HARD_DIRT]) & (np.random.random(game_map.shape) < CRACKED_DIRT_CHANCE)
+    game_map[crack_mask] = TILE_CRACKED_DIRT
 
     # --- Seed Fluids ---
     seed_fluid_pockets(game_map, TOTAL_WATER_POCKETS, TILE_WATER_SOURCE)
     seed_fluid_pockets(game_map, TOTAL_LAVA_POCKETS, TILE_LAVA_SOURCE)
 
+    # --- Seed Chests ---
+    # NEW: Placed after the pockets so a 3x3 pocket can't cover one
+    # NEW: Sample distinct eligible tiles directly instead of retrying random spots
+    chest_candidates = np.flatnonzero((game_map == TILE_HARD_DIRT) | (game_map == TILE_CRACKED_DIRT))
+    chest_spots = np.random.choice(chest_candidates, min(TOTAL_CHESTS, len(chest_candidates)), replace=False)
+    game_map.flat[chest_spots] = TILE_CHEST
+    TOTAL_CHESTS = len(chest_spots) # Too few candidates must not make the level unwinnable
+
     # --- 4. Generate Fog Map ---
-    fog_map = [[TILE_FOG_HIDDEN for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+    fog_map = np.full((MAP_HEIGHT, MAP_WIDTH), TILE_FOG_HIDDEN, dtype=np.uint8)
 
     # --- 5. Generate Fluid Lifetime Map ---
-    fluid_lifetime_map = [[0 for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+    # float32: holds evaporation ms timestamps (exact for the first ~4.6 hours); 0 means no timer
+    fluid_lifetime_map = np.zeros((MAP_HEIGHT, MAP_WIDTH), dtype=np.float32)
+    # NEW: Scratch buffers reused by every fluid tick on this level
+    fluid_spare_map = np.empty_like(game_map)
+    fluid_spare_lifetimes = np.zeros_like(fluid_lifetime_map)
+    fluid_visited_map = np.zeros((MAP_HEIGHT, MAP_WIDTH), dtype=np.bool_)
+    fluid_connected_map = np.zeros((MAP_HEIGHT, MAP_WIDTH), dtype=np.bool_)
+    fluid_active_map = np.zeros((MAP_HEIGHT, MAP_WIDTH), dtype=np.bool_)
+    fluid_frontier_pending = False
+    fluid_reconnect_needed = True # The first tick connects every source with a full step
+    warm_jit_kernels()
 
     # --- 6. Reset Game Objects & State ---
+    terrain_chunks.clear() # New map: every chunk re-bakes when it is next on screen
+    dirty_tiles.clear()
     arrow_list = []
+    arrow_index = {}
     dwarf_list = []
-    flood_warnings = []
+    dwarf_pool = DwarfPool()
+    flood_warnings = FloodWarnings()
     
     gold_count = 0
     chests_found = 0
@@ -669,23 +953,28 @@ def center_camera_on_spawn():
     clamp_camera()
 
 def seed_fluid_pockets(game_map, num_pockets, tile_type):
+    # NEW: Pocket centres are dirt outside the safe core box; visit them in random order
+    yy, xx = np.ogrid[:MAP_HEIGHT, :MAP_WIDTH]
+    in_core = (np.abs(xx - SPAWN_POINT_X) <= HARD_DIRT_RADIUS) & (np.abs(yy - SPAWN_POINT_Y) <= HARD_DIRT_RADIUS)
+    candidates = np.flatnonzero(np.isin(game_map, POCKET_TILES) & ~in_core)
+    
     pockets_placed = 0
-    while pockets_placed < num_pockets:
-        rand_x = random.randint(0, MAP_WIDTH - 1)
-        rand_y = random.randint(0, MAP_HEIGHT - 1)
-        
-        current_tile_at_spot = game_map[rand_y][rand_x]
-        if (current_tile_at_spot in [TILE_DIRT, TILE_HARD_DIRT, TILE_CRACKED_DIRT] and
-            ((abs(rand_x - SPAWN_POINT_X) > HARD_DIRT_RADIUS) or (abs(rand_y - SPAWN_POINT_Y) > HARD_DIRT_RADIUS))):
-            
-            for y_offset in range(-1, 2):
-                for x_offset in range(-1, 2):
-                    pocket_x = rand_x + x_offset
-                    pocket_y = rand_y + y_offset
-                    if (0 <= pocket_x < MAP_WIDTH) and (0 <= pocket_y < MAP_HEIGHT):
-                         game_map[pocket_y][pocket_x] = tile_type
+    for spot in np.random.permutation(candidates).tolist():
+        if pockets_placed == num_pockets:
+            break
+        rand_y, rand_x = divmod(spot, MAP_WIDTH)
+        if game_map[rand_y, rand_x] in POCKET_TILES: # An earlier pocket may have covered it
+            # NEW: 3x3 pocket as one clipped slice
+            game_map[max(0, rand_y - 1):rand_y + 2, max(0, rand_x - 1):rand_x + 2] = tile_type
             pockets_placed += 1
 
+def build_dwarf_index(dwarf_list):
+    """NEW: Buckets dwarves by (x, y) so collision and merge checks are dict lookups."""
+    dwarf_index = {}
+    for dwarf in dwarf_list:
+        dwarf_index.setdefault((dwarf.x, dwarf.y), []).append(dwarf)
+    return dwarf_index
+
 def perform_upgrade(dwarf_list, current_upgrade_level):
     """NEW: Robust upgrade function that loops to find dwarves."""
     if current_upgrade_level > MAX_LEVEL:
@@ -744,136 +1033,646 @@ def give_random_tool(dwarf):
         
     play_sound('upgrade') # Play upgrade sound for getting a tool
 
+@njit(cache=NUMBA_CACHE)
+def flood_connected_fluids(game_map, visited_map):
+    """NEW: BFS from every source through water/lava; sets visited_map where fluid is connected."""
+    height, width = game_map.shape
+    # NEW: Flat y*width+x queue; every tile is pushed at most once, so it never grows
+    queue = np.empty(height * width, dtype=np.int32)
+    head = 0
+    tail = 0
+    for y in range(height):
+        for x in range(width):
+            if game_map[y, x] == TILE_WATER_SOURCE or game_map[y, x] == TILE_LAVA_SOURCE:
+                queue[tail] = y * width + x
+                tail += 1
+                visited_map[y, x] = True
+
+    while head < tail:
+        y, x = divmod(queue[head], width)
+        head += 1
+        
+        # Neighbours unrolled: below, above, right, left
+        if y + 1 < height and not visited_map[y+1, x]:
+            if game_map[y+1, x] == TILE_WATER or game_map[y+1, x] == TILE_LAVA:
+                visited_map[y+1, x] = True
+                queue[tail] = (y + 1) * width + x
+                tail += 1
+        if y - 1 >= 0 and not visited_map[y-1, x]:
+            if game_map[y-1, x] == TILE_WATER or game_map[y-1, x] == TILE_LAVA:
+                visited_map[y-1, x] = True
+                queue[tail] = (y - 1) * width + x
+                tail += 1
+        if x + 1 < width and not visited_map[y, x+1]:
+            if game_map[y, x+1] == TILE_WATER or game_map[y, x+1] == TILE_LAVA:
+                visited_map[y, x+1] = True
+                queue[tail] = y * width + x + 1
+                tail += 1
+        if x - 1 >= 0 and not visited_map[y, x-1]:
+            if game_map[y, x-1] == TILE_WATER or game_map[y, x-1] == TILE_LAVA:
+                visited_map[y, x-1] = True
+                queue[tail] = y * width + x - 1
+                tail += 1
+
+def dilate_connected_fluids(game_map, visited_map):
+    """NEW: Same result as the BFS, by growing the source mask through fluid until it stops."""
+    is_fluid = (game_map == TILE_WATER) | (game_map == TILE_LAVA)
+    connected = visited_map
+    connected |= (game_map == TILE_WATER_SOURCE) | (game_map == TILE_LAVA_SOURCE)
+    connected_count = np.count_nonzero(connected)
+    while True:
+        connected[1:] |= connected[:-1] & is_fluid[1:]
+        connected[:-1] |= connected[1:] & is_fluid[:-1]
+        connected[:, 1:] |= connected[:, :-1] & is_fluid[:, 1:]
+        connected[:, :-1] |= connected[:, 1:] & is_fluid[:, :-1]
+        new_count = np.count_nonzero(connected)
+        if new_count == connected_count:
+            break
+        connected_count = new_count
+
+
+def shift_grid(grid, dy, dx, fill=0):
+    """NEW: Returns a copy of grid moved by (dy, dx) tiles; cells moved in from off-map get fill."""
+    height, width = grid.shape
+    shifted = np.full_like(grid, fill)
+    shifted[max(0, dy):height + min(0, dy), max(0, dx):width + min(0, dx)] = \
+        grid[max(0, -dy):height + min(0, -dy), max(0, -dx):width + min(0, -dx)]
+    return shifted
+
+@njit(cache=NUMBA_CACHE)
+def pour_source_fluid(game_map, next_game_map, next_lifetime_map, next_connected_map, nx, ny, fluid_type, flood_cells):
+    """NEW: A source floods one empty in-bounds neighbour with connected fluid."""
+    if game_map[ny, nx] == TILE_EMPTY:
+        next_game_map[ny, nx] = fluid_type
+        next_connected_map[ny, nx] = True
+        next_lifetime_map[ny, nx] = 0
+        flood_cells.append((nx, ny))
+
+@njit(cache=NUMBA_CACHE)
+def step_fluid_tile(game_map, fluid_lifetime_map, connected_map, current_time,
+                    next_game_map, next_lifetime_map, next_connected_map, x, y, flood_cells):
+    """NEW: Phase 2 of update_fluids for one tile; tiles must be visited bottom row first, left to right."""
+    height, width = game_map.shape
+    current_tile = game_map[y, x]
+    # Check connection status from the *newly computed* map
+    is_connected = next_connected_map[y, x]
+
+    if current_tile == TILE_WATER_SOURCE or current_tile == TILE_LAVA_SOURCE:
+        fluid_type = TILE_WATER if current_tile == TILE_WATER_SOURCE else TILE_LAVA
+        # Neighbours unrolled: below, above, right, left
+        if y + 1 < height:
+            pour_source_fluid(game_map, next_game_map, next_lifetime_map, next_connected_map, x, y + 1, fluid_type, flood_cells)
+        if y - 1 >= 0:
+            pour_source_fluid(game_map, next_game_map, next_lifetime_map, next_connected_map, x, y - 1, fluid_type, flood_cells)
+        if x + 1 < width:
+            pour_source_fluid(game_map, next_game_map, next_lifetime_map, next_connected_map, x + 1, y, fluid_type, flood_cells)
+        if x - 1 >= 0:
+            pour_source_fluid(game_map, next_game_map, next_lifetime_map, next_connected_map, x - 1, y, fluid_type, flood_cells)
+
+    elif current_tile == TILE_WATER or current_tile == TILE_LAVA:
+        if is_connected:
+            # This fluid is alive and connected. Keep it and spread.
+            if y + 1 < height and game_map[y+1, x] == TILE_EMPTY:
+                next_game_map[y+1, x] = current_tile
+                next_connected_map[y+1, x] = True
+                next_lifetime_map[y+1, x] = 0
+            elif y + 1 < height:
+                if x - 1 >= 0 and game_map[y, x-1] == TILE_EMPTY:
+                    next_game_map[y, x-1] = current_tile
+                    next_connected_map[y, x-1] = True
+                    next_lifetime_map[y, x-1] = 0
+                if x + 1 < width and game_map[y, x+1] == TILE_EMPTY:
+                    next_game_map[y, x+1] = current_tile
+                    next_connected_map[y, x+1] = True
+                    next_lifetime_map[y, x+1] = 0
+        
+        else: # This fluid is ORPHANED
+            # Get lifetime from *previous* map
+            old_lifetime = fluid_lifetime_map[y, x]
+            
+            # BUGFIX 2: Check if it *was* connected, not if it was empty (0)
+            if connected_map[y, x]:
+                # Was *just* disconnected. Start its timer.
+                next_lifetime_map[y, x] = current_time + FLUID_LIFETIME
+            
+            elif old_lifetime > 0: # Timer was already ticking
+                if current_time > old_lifetime:
+                    # Timer is up! Evaporate.
+                    next_game_map[y, x] = TILE_EMPTY
+                    next_lifetime_map[y, x] = 0
+                elif y + 1 < height and game_map[y+1, x] == TILE_EMPTY:
+                    # Only flow down, taking the timer along; the current tile empties
+                    next_game_map[y+1, x] = current_tile
+                    next_connected_map[y+1, x] = False
+                    next_lifetime_map[y+1, x] = old_lifetime
+                    next_game_map[y, x] = TILE_EMPTY
+                    next_lifetime_map[y, x] = 0
+                else:
+                    next_lifetime_map[y, x] = old_lifetime # Keep timer
+            # If old_lifetime == 0, this tile was empty/dirt.
+            # It will be filled by a tile *above* it, if applicable.
+            # So we do nothing here.
+
+@njit(cache=NUMBA_CACHE)
+def step_fluids_compiled(game_map, fluid_lifetime_map, connected_map, current_time,
+                         next_game_map, next_lifetime_map, next_connected_map):
+    """NEW: Phases 1 and 2 of update_fluids as one compiled per-tile pass; returns the flooded (x, y) tiles."""
+    height, width = game_map.shape
+    flood_cells = [(0, 0)] # Typed for Numba, dropped below
+    flood_cells.pop()
+
+    # --- Phase 1: Flood Fill from all sources ---
+    # The BFS marks the *new* connected map; Phase 2 only adds empty tiles to it
+    flood_connected_fluids(game_map, next_connected_map)
+
+    # --- Phase 2: Flow, Spread, and Evaporate ---
+    for y in range(height - 1, -1, -1):
+        for x in range(width):
+            step_fluid_tile(game_map, fluid_lifetime_map, connected_map, current_time,
+                            next_game_map, next_lifetime_map, next_connected_map, x, y, flood_cells)
+    return flood_cells
+
+FRONTIER_UNCHANGED = 0 # NEW: mark_fluid_frontier() results
+FRONTIER_ORPHAN = 1
+FRONTIER_CHANGED = 2
+
+@njit(cache=NUMBA_CACHE)
+def mark_fluid_frontier(game_map, next_game_map, next_connected_map, active_map, x, y):
+    """NEW: Adds (x, y) to next tick's frontier if it changed (with its neighbours) or is orphaned fluid."""
+    height, width = game_map.shape
+    tile = next_game_map[y, x]
+    if tile != game_map[y, x]:
+        # Whatever it can pour into, or is poured into from, has to look again
+        active_map[y, x] = True
+        if y + 1 < height:
+            active_map[y+1, x] = True
+        if y - 1 >= 0:
+            active_map[y-1, x] = True
+        if x + 1 < width:
+            active_map[y, x+1] = True
+        if x - 1 >= 0:
+            active_map[y, x-1] = True
+        return FRONTIER_CHANGED
+    if (tile == TILE_WATER or tile == TILE_LAVA) and not next_connected_map[y, x]:
+        active_map[y, x] = True # Orphans run their timers every tick
+        return FRONTIER_ORPHAN
+    return FRONTIER_UNCHANGED
+
+@njit(cache=NUMBA_CACHE)
+def step_fluids_frontier(game_map, fluid_lifetime_map, connected_map, current_time, visit_cells,
+                         next_game_map, active_map):
+    """NEW: step_fluids_compiled() for just the frontier tiles; nothing else on the map can change.
+
+    visit_cells are the frontier's flat y*width+x indices, ascending. Only used when no fluid was
+    removed since the last tick, so connections only grow and the lifetime and connected maps can
+    be updated in place. Marks next tick's frontier in active_map.
+    Returns the flooded (x, y) tiles, the changed tiles as flat indices (may repeat) and whether
+    the new frontier is non-empty.
+    """
+    height, width = game_map.shape
+    flood_cells = [(0, 0)] # Typed for Numba, dropped below
+    flood_cells.pop()
+
+    # --- Phase 1: Connect orphaned fluid that now touches connected fluid or a source ---
+    queue = [0]
+    queue.pop()
+    for cell in visit_cells:
+        y, x = divmod(cell, width)
+        tile = game_map[y, x]
+        if (tile == TILE_WATER or tile == TILE_LAVA) and not connected_map[y, x]:
+            if ((y + 1 < height and connected_map[y+1, x]) or (y - 1 >= 0 and connected_map[y-1, x]) or
+                    (x + 1 < width and connected_map[y, x+1]) or (x - 1 >= 0 and connected_map[y, x-1])):
+                connected_map[y, x] = True
+                queue.append(cell)
+    while len(queue) > 0:
+        y, x = divmod(queue.pop(), width)
+        fluid_lifetime_map[y, x] = 0 # Connected fluid has no timer
+        # Neighbours unrolled: below, above, right, left
+        if y + 1 < height and not connected_map[y+1, x]:
+            if game_map[y+1, x] == TILE_WATER or game_map[y+1, x] == TILE_LAVA:
+                connected_map[y+1, x] = True
+                queue.append((y + 1) * width + x)
+        if y - 1 >= 0 and not connected_map[y-1, x]:
+            if game_map[y-1, x] == TILE_WATER or game_map[y-1, x] == TILE_LAVA:
+                connected_map[y-1, x] = True
+                queue.append((y - 1) * width + x)
+        if x + 1 < width and not connected_map[y, x+1]:
+            if game_map[y, x+1] == TILE_WATER or game_map[y, x+1] == TILE_LAVA:
+                connected_map[y, x+1] = True
+                queue.append(y * width + x + 1)
+        if x - 1 >= 0 and not connected_map[y, x-1]:
+            if game_map[y, x-1] == TILE_WATER or game_map[y, x-1] == TILE_LAVA:
+                connected_map[y, x-1] = True
+                queue.append(y * width + x - 1)
+
+    # --- Phase 2: Flow, Spread, and Evaporate, in the full scan's order ---
+    # Nothing was disconnected, so the old and new connected maps agree wherever Phase 2 reads them
+    end = len(visit_cells)
+    while end > 0:
+        row = visit_cells[end - 1] // width
+        start = end - 1
+        while start > 0 and visit_cells[start - 1] // width == row:
+            start -= 1
+        for k in range(start, end):
+            y, x = divmod(visit_cells[k], width)
+            step_fluid_tile(game_map, fluid_lifetime_map, connected_map, current_time,
+                            next_game_map, fluid_lifetime_map, connected_map, x, y, flood_cells)
+        end = start
+
+    # --- Phase 3: Next tick's frontier; every write landed on a visited tile or a neighbour ---
+    # An array, not a list of tuples: unboxing thousands of typed-list items in Python is slow
+    changed_cells = np.empty(5 * len(visit_cells), dtype=np.int64)
+    changed_count = 0
+    has_frontier = False
+    for cell in visit_cells:
+        y, x = divmod(cell, width)
+        for ny, nx in ((y, x), (y + 1, x), (y - 1, x), (y, x + 1), (y, x - 1)):
+            if 0 <= ny < height and 0 <= nx < width:
+                status = mark_fluid_frontier(game_map, next_game_map, connected_map, active_map, nx, ny)
+                if status == FRONTIER_CHANGED:
+                    changed_cells[changed_count] = ny * width + nx
+                    changed_count += 1
+                has_frontier |= status != FRONTIER_UNCHANGED
+    return flood_cells, changed_cells[:changed_count], has_frontier
+
+def step_fluids_vectorized(game_map, fluid_lifetime_map, connected_map, current_time,
+                           next_game_map, next_lifetime_map, next_connected_map):
+    """NEW: Whole-map NumPy stencil version of step_fluids_compiled(); returns the flooded (x, y) tiles."""
+    flood_cells = []
+
+    # --- Phase 1: Flood Fill from all sources ---
+    dilate_connected_fluids(game_map, next_connected_map)
+
+    # --- Phase 2: Flow, Spread, and Evaporate ---
+    # Every rule reads the *old* map, so the whole step can run as array ops
+    is_empty = game_map == TILE_EMPTY
+    is_source = (game_map == TILE_WATER_SOURCE) | (game_map == TILE_LAVA_SOURCE)
+    is_fluid = (game_map == TILE_WATER) | (game_map == TILE_LAVA)
+    below_empty = shift_grid(is_empty, -1, 0, False)
+    has_floor = shift_grid(~is_empty, -1, 0, False) # Tile below exists and isn't empty
+
+    connected_fluid = is_fluid & next_connected_map
+    orphaned = is_fluid & ~next_connected_map
+    # BUGFIX 2: Check if it *was* connected, not if it was empty (0)
+    just_orphaned = orphaned & connected_map
+    ticking = orphaned & ~just_orphaned & (fluid_lifetime_map > 0)
+    evaporated = ticking & (current_time > fluid_lifetime_map)
+    ticking &= ~evaporated
+    falling = ticking & below_empty
+
+    # Orphans: start the timer, keep it, or evaporate / fall (which empties the tile).
+    # If old_lifetime == 0 the tile was empty/dirt last step, so it is left alone.
+    next_lifetime_map[just_orphaned] = current_time + FLUID_LIFETIME
+    keeps_timer = ticking & ~below_empty
+    next_lifetime_map[keeps_timer] = fluid_lifetime_map[keeps_timer]
+    next_game_map[evaporated | falling] = TILE_EMPTY
+
+    # What each tile pours into an empty neighbour: sources emit their fluid, fluids copy themselves
+    flow_tile = np.where(game_map == TILE_WATER_SOURCE, TILE_WATER,
+                         np.where(game_map == TILE_LAVA_SOURCE, TILE_LAVA, game_map)).astype(np.uint8)
+    flow_lifetime = np.where(ticking, fluid_lifetime_map, 0) # Falling orphans pass their timer
+    pours_down = is_source | connected_fluid | ticking
+    pours_sideways = is_source | (connected_fluid & has_floor)
+
+    # The old bottom-up, left-to-right scan let the last writer win: below < left < right < above
+    for dy, dx, pours in ((-1, 0, is_source), (0, 1, pours_sideways), (0, -1, pours_sideways), (1, 0, pours_down)):
+        fill_rows, fill_cols = np.nonzero(is_empty & shift_grid(pours, dy, dx, False))
+        from_rows, from_cols = fill_rows - dy, fill_cols - dx # The tile pouring into each one
+        next_game_map[fill_rows, fill_cols] = flow_tile[from_rows, from_cols]
+        next_lifetime_map[fill_rows, fill_cols] = flow_lifetime[from_rows, from_cols]
+        next_connected_map[fill_rows, fill_cols] = ~ticking[from_rows, from_cols] # Only falling orphans pour unconnected fluid
+        from_source = is_source[from_rows, from_cols]
+        flood_cells.extend(zip(fill_cols[from_source].tolist(), fill_rows[from_source].tolist()))
+
+    return flood_cells
+
+def mark_full_fluid_frontier(game_map, next_game_map, next_connected_map):
+    """NEW: Whole-map version of mark_fluid_frontier() after a full step; returns the changed (x, y) tiles."""
+    changed = next_game_map != game_map
+    fluid_active_map[...] = changed
+    fluid_active_map[1:] |= changed[:-1]
+    fluid_active_map[:-1] |= changed[1:]
+    fluid_active_map[:, 1:] |= changed[:, :-1]
+    fluid_active_map[:, :-1] |= changed[:, 1:]
+    fluid_active_map[((next_game_map == TILE_WATER) | (next_game_map == TILE_LAVA)) & ~next_connected_map] = True
+    changed_rows, changed_cols = np.nonzero(changed)
+    return list(zip(changed_cols.tolist(), changed_rows.tolist()))
+
+def wake_fluids(x, y, removed_fluid=False):
+    """NEW: Puts a tile changed outside update_fluids() (digs, walls, cave-ins) back on the fluid frontier.
+
+    removed_fluid means a water/lava tile was replaced, which can cut fluid off from its source.
+    """
+    global fluid_frontier_pending, fluid_reconnect_needed
+    fluid_active_map[max(0, y - 1):y + 2, max(0, x - 1):x + 2] = True
+    fluid_frontier_pending = True
+    if removed_fluid:
+        fluid_reconnect_needed = True
+
 def update_fluids(game_map, fluid_lifetime_map, current_time):
     """Simulates one step of fluid physics with persistent sources and evaporation."""
+    global fluid_spare_map, fluid_spare_lifetimes, fluid_visited_map, fluid_connected_map
+    global fluid_active_map, fluid_frontier_pending, fluid_reconnect_needed
+    
+    # NEW: Only tiles on the active frontier can change; when it is empty the tick is a no-op
+    if fluid_active_map is None or fluid_active_map.shape != game_map.shape:
+        fluid_active_map = np.zeros(game_map.shape, dtype=np.bool_)
+        fluid_reconnect_needed = True # Unknown map, so start with one full step
+    if not fluid_frontier_pending and not fluid_reconnect_needed:
+        return game_map, fluid_lifetime_map, []
+    
+    # NEW: Double-buffered: write into the spare arrays, then the inputs become the spares
+    if (fluid_spare_map is None or fluid_spare_map.shape != game_map.shape or
+            fluid_spare_map is game_map or fluid_spare_lifetimes is fluid_lifetime_map):
+        fluid_spare_map = np.empty_like(game_map)
+        fluid_spare_lifetimes = np.empty_like(fluid_lifetime_map)
+        fluid_visited_map = np.empty(game_map.shape, dtype=np.bool_)
+    if fluid_connected_map is None or fluid_connected_map.shape != game_map.shape:
+        fluid_connected_map = np.zeros(game_map.shape, dtype=np.bool_) # Nothing was connected yet
+        fluid_reconnect_needed = True
+    next_game_map = fluid_spare_map
+    np.copyto(next_game_map, game_map)
+    
+    visit_cells = np.flatnonzero(fluid_active_map)
+    fluid_active_map.flat[visit_cells] = False
+    # Without Numba the frontier step runs tile by tile in Python, so big frontiers use the NumPy step
+    if not fluid_reconnect_needed and (HAVE_NUMBA or len(visit_cells) <= FLUID_FRONTIER_PYTHON_TILES):
+        # --- Phases 1 & 2 on the frontier only; connections only grow, so they update in place ---
+        flood_cells, changed_cells, fluid_frontier_pending = step_fluids_frontier(
+            game_map, fluid_lifetime_map, fluid_connected_map, current_time, visit_cells,
+            next_game_map, fluid_active_map)
+        changed_rows, changed_cols = np.divmod(changed_cells, game_map.shape[1])
+        dirty_tiles.update(zip(changed_cols.tolist(), changed_rows.tolist()))
+        fluid_spare_map = game_map # Caller adopts the new map
+        new_floods = [(x, y, current_time + WARNING_DURATION) for x, y in flood_cells]
+        return next_game_map, fluid_lifetime_map, new_floods
+    fluid_reconnect_needed = False
     
-    next_game_map = copy.deepcopy(game_map)
     # BUGFIX 1: Initialize next_lifetime_map to 0s, not a copy.
-    next_lifetime_map = [[0 for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+    next_lifetime_map = fluid_spare_lifetimes
+    next_lifetime_map.fill(0)
     
-    visited_map = [[False for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
-    queue = []
-    new_floods = []
+    next_connected_map = fluid_visited_map
+    next_connected_map.fill(False)
 
-    # --- Phase 1: Flood Fill from all sources ---
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            if game_map[y][x] == TILE_WATER_SOURCE or game_map[y][x] == TILE_LAVA_SOURCE:
-                queue.append((x, y))
-                visited_map[y][x] = True
-                next_lifetime_map[y][x] = float('inf') # Mark as connected in *new* map
-
-    head = 0
-    while head < len(queue):
-        x, y = queue[head]
-        head += 1
-        
-        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            nx, ny = x + dx, y + dy
-            if (0 <= nx < MAP_WIDTH) and (0 <= ny < MAP_HEIGHT) and not visited_map[ny][nx]:
-                if game_map[ny][nx] == TILE_WATER or game_map[ny][nx] == TILE_LAVA:
-                    visited_map[ny][nx] = True
-                    next_lifetime_map[ny][nx] = float('inf') # Propagate "connected"
-                    queue.append((nx, ny))
+    # --- Phases 1 & 2: Connect, Flow, Spread, and Evaporate, over the whole map ---
+    # NEW: Compiled per-tile pass when Numba is available, otherwise whole-array NumPy ops
+    step_fluids = step_fluids_compiled if HAVE_NUMBA else step_fluids_vectorized
+    flood_cells = step_fluids(game_map, fluid_lifetime_map, fluid_connected_map, current_time,
+                              next_game_map, next_lifetime_map, next_connected_map)
+    new_floods = [(x, y, current_time + WARNING_DURATION) for x, y in flood_cells]
 
-    # --- Phase 2: Flow, Spread, and Evaporate ---
-    for y in range(MAP_HEIGHT - 1, -1, -1):
-        for x in range(MAP_WIDTH):
-            current_tile = game_map[y][x]
-            # Check connection status from the *newly computed* map
-            is_connected = (next_lifetime_map[y][x] == float('inf'))
-
-            if current_tile == TILE_WATER_SOURCE or current_tile == TILE_LAVA_SOURCE:
-                next_game_map[y][x] = current_tile
-                fluid_type = TILE_WATER if current_tile == TILE_WATER_SOURCE else TILE_LAVA
-                for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                    nx, ny = x + dx, y + dy
-                    if (0 <= nx < MAP_WIDTH) and (0 <= ny < MAP_HEIGHT):
-                        if game_map[ny][nx] == TILE_EMPTY:
-                            next_game_map[ny][nx] = fluid_type
-                            next_lifetime_map[ny][nx] = float('inf')
-                            new_floods.append((nx, ny, current_time + WARNING_DURATION))
-
-            elif current_tile == TILE_WATER or current_tile == TILE_LAVA:
-                if is_connected:
-                    # This fluid is alive and connected. Keep it and spread.
-                    next_game_map[y][x] = current_tile
-                    
-                    if y + 1 < MAP_HEIGHT and game_map[y+1][x] == TILE_EMPTY:
-                        next_game_map[y+1][x] = current_tile
-                        next_lifetime_map[y+1][x] = float('inf')
-                    elif y + 1 < MAP_HEIGHT:
-                        if x - 1 >= 0 and game_map[y][x-1] == TILE_EMPTY:
-                            next_game_map[y][x-1] = current_tile
-                            next_lifetime_map[y][x-1] = float('inf')
-                        if x + 1 < MAP_WIDTH and game_map[y][x+1] == TILE_EMPTY:
-                            next_game_map[y][x+1] = current_tile
-                            next_lifetime_map[y][x+1] = float('inf')
-                
-                else: # This fluid is ORPHANED
-                    # Get lifetime from *previous* map
-                    old_lifetime = fluid_lifetime_map[y][x] 
-                    
-                    # BUGFIX 2: Check if it *was* connected (inf), not if it was empty (0)
-                    if old_lifetime == float('inf'):
-                        # Was *just* disconnected. Start its timer.
-                        new_lifetime = current_time + FLUID_LIFETIME
-                        next_game_map[y][x] = current_tile
-                        next_lifetime_map[y][x] = new_lifetime # Set timer in *new* map
-                    
-                    elif old_lifetime > 0: # Timer was already ticking
-                        if current_time > old_lifetime:
-                            # Timer is up! Evaporate.
-                            next_game_map[y][x] = TILE_EMPTY
-                            next_lifetime_map[y][x] = 0
-                        else:
-                            # Timer is ticking. Keep it, but only flow down.
-                            next_game_map[y][x] = current_tile
-                            next_lifetime_map[y][x] = old_lifetime # Keep timer
-                            
-                            if y + 1 < MAP_HEIGHT and game_map[y+1][x] == TILE_EMPTY:
-                                next_game_map[y+1][x] = current_tile
-                                next_lifetime_map[y+1][x] = old_lifetime # Pass timer
-                                
-                                # It MOVED, so clear the current tile
-                                next_game_map[y][x] = TILE_EMPTY
-                                next_lifetime_map[y][x] = 0
-                    # If old_lifetime == 0, this tile was empty/dirt.
-                    # It will be filled by a tile *above* it, if applicable.
-                    # So we do nothing here.
+    dirty_tiles.update(mark_full_fluid_frontier(game_map, next_game_map, next_connected_map))
+    fluid_frontier_pending = bool(fluid_active_map.any())
 
+    fluid_spare_map, fluid_spare_lifetimes = game_map, fluid_lifetime_map # Caller adopts the new arrays
+    fluid_connected_map, fluid_visited_map = next_connected_map, fluid_connected_map
     return next_game_map, next_lifetime_map, new_floods
+
+jit_kernels_warm = False
+
+def warm_jit_kernels():
+    """NEW: Runs each compiled kernel once on a tiny map so the JIT pause happens while loading, not mid-game."""
+    global jit_kernels_warm, HAVE_NUMBA, scan_dwarf_tiles
+    if jit_kernels_warm or not HAVE_NUMBA:
+        return
+    jit_kernels_warm = True
+    dummy_map = np.full((3, 3), TILE_EMPTY, dtype=np.uint8)
+    dummy_map[1, 1] = TILE_WATER_SOURCE
+    dummy_lifetimes = np.zeros((3, 3), dtype=np.float32)
+    try:
+        step_fluids_compiled(dummy_map, dummy_lifetimes, np.zeros((3, 3), dtype=np.bool_), 0,
+                             dummy_map.copy(), np.zeros_like(dummy_lifetimes), np.zeros((3, 3), dtype=np.bool_))
+        step_fluids_frontier(dummy_map, dummy_lifetimes, np.zeros((3, 3), dtype=np.bool_), 0,
+                             np.flatnonzero(dummy_map), dummy_map.copy(), np.zeros((3, 3), dtype=np.bool_))
+        scan_dwarf_tiles(dummy_map, 0, 0, 1, 0, 1, False) # Same argument types Dwarf.update() passes
+    except Exception: # Compilation failed on this machine; use the NumPy/Python paths instead
+        HAVE_NUMBA = False
+        scan_dwarf_tiles = scan_dwarf_tiles.py_func
         
 def find_adjacent_empty_tile(x, y, game_map):
-    for dx, dy in [(1, 0), (-1, 0), (0, 1), (-1, 0)]:
+    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)): # BUGFIX: (-1, 0) was listed twice, up was never tried
         new_x, new_y = x + dx, y + dy
         if (0 <= new_x < MAP_WIDTH) and (0 <= new_y < MAP_HEIGHT):
-            if game_map[new_y][new_x] == TILE_EMPTY:
+            if game_map[new_y, new_x] == TILE_EMPTY:
                 return new_x, new_y
     return x, y
 
-def draw_minimap(surface, current_time):
-    """NEW: Draws the entire game state onto the minimap surface."""
+def queue_terrain_tile(col, row, screen_pos, tile_blits):
+    """NEW: Adds one revealed tile's terrain, grid and loot blits, in draw order."""
+    tile_type = game_map[row, col]
     
-    flash_on = (current_time // 250) % 2 == 0
-    minimap_surface.fill(MINIMAP_BG_COLOR)
+    # --- Layer 1: Base Terrain (Floor) ---
+    sprite_to_draw = terrain_sprite_lut[tile_type]
+    # --- Layer 2: Loot (On top of terrain) ---
+    loot_sprite = loot_sprite_lut[tile_type]
+    if IS_REWARD_TILE[tile_type]:
+        sprite_to_draw = terrain_sprite_lut[TILE_HARD_DIRT if is_hard_ring[row, col] else TILE_DIRT]
     
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            if fog_map[y][x] == TILE_FOG_REVEALED:
-                tile_type = game_map[y][x]
-                color = MINIMAP_COLORS.get(tile_type, (0,0,0))
-                
-                if tile_type in [TILE_WATER, TILE_LAVA, TILE_WATER_SOURCE, TILE_LAVA_SOURCE]:
-                    if not flash_on:
-                        color = (color[0]//2, color[1]//2, color[2]//2)
-                
-                mini_x = int(x * minimap_pixel_size_x)
-                mini_y = int(y * minimap_pixel_size_y)
-                mini_w = max(1, int((x + 1) * minimap_pixel_size_x) - mini_x)
-                mini_h = max(1, int((y + 1) * minimap_pixel_size_y) - mini_y)
+    if sprite_to_draw:
+        tile_blits.append((sprite_to_draw, screen_pos))
+    if terrain_grid_tile is not None:
+        tile_blits.append((terrain_grid_tile, screen_pos))
+    if loot_sprite:
+        tile_blits.append((loot_sprite, screen_pos))
+
+def draw_terrain_tiles(chunk_surface, tiles, first_col, first_row):
+    """NEW: Draws revealed (col, row) tiles onto the chunk whose top-left tile is (first_col, first_row)."""
+    tile_blits = []
+    for col, row in tiles:
+        screen_pos = ((col - first_col) * terrain_tile_size, (row - first_row) * terrain_tile_size)
+        queue_terrain_tile(col, row, screen_pos, tile_blits)
+    chunk_surface.blits(tile_blits, doreturn=False)
+
+def set_terrain_tile_size(tile_size):
+    """NEW: Drops every cached chunk; visible ones re-bake lazily at the new tile size."""
+    global terrain_tile_size, terrain_chunk_tiles, terrain_grid_tile
+    
+    terrain_chunks.clear()
+    terrain_tile_size = tile_size
+    terrain_chunk_tiles = max(1, TERRAIN_CHUNK_PIXELS // tile_size)
+    
+    # One tile-sized grid outline, color-keyed so only the border is blitted
+    terrain_grid_tile = None
+    if tile_size > 5:
+        terrain_grid_tile = pygame.Surface((tile_size, tile_size)).convert()
+        terrain_grid_tile.fill(GRID_COLORKEY)
+        pygame.draw.rect(terrain_grid_tile, COLOR_GRID, (0, 0, tile_size, tile_size), 1)
+        terrain_grid_tile.set_colorkey(GRID_COLORKEY)
+    
+    dirty_tiles.clear() # Chunks bake from the current map, so nothing is stale
+
+def get_terrain_chunk(chunk_col, chunk_row):
+    """NEW: Returns one chunk of the map pre-rendered at terrain_tile_size, baking it on first use."""
+    chunk_surface = terrain_chunks.get((chunk_col, chunk_row))
+    if chunk_surface is not None:
+        return chunk_surface
+    
+    first_col = chunk_col * terrain_chunk_tiles
+    first_row = chunk_row * terrain_chunk_tiles
+    cols = min(terrain_chunk_tiles, MAP_WIDTH - first_col) # Edge chunks are clipped to the map
+    rows = min(terrain_chunk_tiles, MAP_HEIGHT - first_row)
+    chunk_surface = pygame.Surface((cols * terrain_tile_size, rows * terrain_tile_size)).convert()
+    chunk_surface.fill(COLOR_FOG_HIDDEN)
+    
+    chunk_fog = fog_map[first_row:first_row + rows, first_col:first_col + cols]
+    revealed_rows, revealed_cols = np.nonzero(chunk_fog == TILE_FOG_REVEALED)
+    revealed = zip((revealed_cols + first_col).tolist(), (revealed_rows + first_row).tolist())
+    draw_terrain_tiles(chunk_surface, revealed, first_col, first_row)
+    
+    terrain_chunks[(chunk_col, chunk_row)] = chunk_surface
+    return chunk_surface
 
-                pygame.draw.rect(minimap_surface, color, (mini_x, mini_y, mini_w, mini_h))
+def blit_terrain(surface, view_x, view_y, tile_size):
+    """NEW: Draws the on-screen terrain chunks, stretching them while tile_size differs from the cache.
+
+    Returns the rect of surface that was drawn over (empty if nothing was).
+    """
+    map_rect = pygame.Rect(-view_x, -view_y, MAP_WIDTH * tile_size, MAP_HEIGHT * tile_size)
+    dest_rect = map_rect.clip(surface.get_rect())
+    if dest_rect.width <= 0 or dest_rect.height <= 0:
+        return pygame.Rect(0, 0, 0, 0)
+    
+    chunk_pixels = terrain_chunk_tiles * tile_size # One chunk's side on screen
+    scale = terrain_tile_size / tile_size
+    visible_chunks = set()
+    chunk_blits = []
+    for chunk_row in range((dest_rect.top + view_y) // chunk_pixels, (dest_rect.bottom - 1 + view_y) // chunk_pixels + 1):
+        for chunk_col in range((dest_rect.left + view_x) // chunk_pixels, (dest_rect.right - 1 + view_x) // chunk_pixels + 1):
+            visible_chunks.add((chunk_col, chunk_row))
+            chunk_surface = get_terrain_chunk(chunk_col, chunk_row)
+            chunk_x = chunk_col * chunk_pixels - view_x
+            chunk_y = chunk_row * chunk_pixels - view_y
+            if tile_size == terrain_tile_size:
+                chunk_blits.append((chunk_surface, (chunk_x, chunk_y)))
+                continue
+            
+            # Scale just the on-screen part of this chunk
+            chunk_width = chunk_surface.get_width() // terrain_tile_size * tile_size
+            chunk_height = chunk_surface.get_height() // terrain_tile_size * tile_size
+            part_rect = pygame.Rect(chunk_x, chunk_y, chunk_width, chunk_height).clip(dest_rect)
+            source_rect = pygame.Rect(int((part_rect.x - chunk_x) * scale), int((part_rect.y - chunk_y) * scale),
+                                      max(1, int(part_rect.width * scale)), max(1, int(part_rect.height * scale)))
+            source_rect = source_rect.clip(chunk_surface.get_rect())
+            if part_rect.width > 0 and part_rect.height > 0 and source_rect.width > 0 and source_rect.height > 0:
+                stretched = pygame.transform.scale(chunk_surface.subsurface(source_rect), part_rect.size)
+                chunk_blits.append((stretched, part_rect.topleft))
+    surface.blits(chunk_blits, doreturn=False)
+    
+    # Keep memory bounded on big maps: once over the cap, forget everything off-screen
+    if len(terrain_chunks) > MAX_TERRAIN_CHUNKS:
+        for chunk_key in [key for key in terrain_chunks if key not in visible_chunks]:
+            del terrain_chunks[chunk_key]
+    return dest_rect
+
+def fill_outside(surface, covered_rect, color):
+    """NEW: Fills only the parts of surface outside covered_rect (at most four bands)."""
+    width, height = surface.get_size()
+    covered_rect = covered_rect.clip(surface.get_rect())
+    if covered_rect.width <= 0 or covered_rect.height <= 0:
+        surface.fill(color)
+        return
+    if covered_rect.top > 0:
+        surface.fill(color, (0, 0, width, covered_rect.top))
+    if covered_rect.bottom < height:
+        surface.fill(color, (0, covered_rect.bottom, width, height - covered_rect.bottom))
+    if covered_rect.left > 0:
+        surface.fill(color, (0, covered_rect.top, covered_rect.left, covered_rect.height))
+    if covered_rect.right < width:
+        surface.fill(color, (covered_rect.right, covered_rect.top, width - covered_rect.right, covered_rect.height))
+
+def refresh_dirty_tiles():
+    """NEW: Re-bakes only the tiles that changed since the last frame, in chunks that are cached."""
+    revealed_by_chunk = {}
+    for col, row in dirty_tiles:
+        chunk_key = (col // terrain_chunk_tiles, row // terrain_chunk_tiles)
+        chunk_surface = terrain_chunks.get(chunk_key)
+        if chunk_surface is None:
+            continue # Not cached, so it bakes fresh when it next comes on screen
+        local_x = (col - chunk_key[0] * terrain_chunk_tiles) * terrain_tile_size
+        local_y = (row - chunk_key[1] * terrain_chunk_tiles) * terrain_tile_size
+        chunk_surface.fill(COLOR_FOG_HIDDEN, (local_x, local_y, terrain_tile_size, terrain_tile_size))
+        if fog_map[row, col] == TILE_FOG_REVEALED:
+            revealed_by_chunk.setdefault(chunk_key, []).append((col, row))
+    for (chunk_col, chunk_row), tiles in revealed_by_chunk.items():
+        draw_terrain_tiles(terrain_chunks[(chunk_col, chunk_row)], tiles,
+                           chunk_col * terrain_chunk_tiles, chunk_row * terrain_chunk_tiles)
+    dirty_tiles.clear()
+
+def minimap_tile_index(minimap_size, map_size, pixel_size):
+    """NEW: For each minimap pixel along one axis, the map tile drawn there (-1 for none)."""
+    tile_starts = (np.arange(map_size) * pixel_size).astype(int)
+    tile_ends = np.maximum(tile_starts + 1, (np.arange(1, map_size + 1) * pixel_size).astype(int))
+    
+    pixels = np.arange(minimap_size)
+    tile_index = np.searchsorted(tile_starts, pixels, side='right') - 1 # Later tiles win overlaps
+    tile_index[pixels >= tile_ends[tile_index]] = -1
+    return tile_index
+
+def minimap_pixel_span(tile_index, first_tile, end_tile):
+    """NEW: The (start, end) minimap pixels showing tiles first_tile..end_tile-1, or None."""
+    pixels = np.nonzero((tile_index >= first_tile) & (tile_index < end_tile))[0]
+    if len(pixels) == 0:
+        return None
+    return pixels[0], pixels[-1] + 1
+
+def render_minimap_tiles(tile_box=None):
+    """NEW: Renders revealed tiles onto both minimap flash surfaces with array writes.
+
+    tile_box is an (x0, y0, x1, y1) tile range to refresh; None re-renders the whole map.
+    """
+    if tile_box is None:
+        tile_box = (0, 0, MAP_WIDTH, MAP_HEIGHT)
+    x_span = minimap_pixel_span(minimap_col_index, tile_box[0], tile_box[2])
+    y_span = minimap_pixel_span(minimap_row_index, tile_box[1], tile_box[3])
+    if x_span is None or y_span is None:
+        return # Those tiles don't land on any minimap pixel
+    px0, px1 = x_span
+    py0, py1 = y_span
+    
+    # Gather tiles into minimap pixels, (rows, cols) -> (height, width)
+    rows = minimap_row_index[py0:py1, None]
+    cols = minimap_col_index[None, px0:px1]
+    pixel_tiles = game_map[rows, cols]
+    pixel_shown = (fog_map[rows, cols] == TILE_FOG_REVEALED) & (rows >= 0) & (cols >= 0)
+    pixel_alphas = np.where(pixel_shown, 255, MINIMAP_BG_COLOR[3]).T
+    
+    for target_surface, color_lut in ((minimap_bright_surface, MINIMAP_LUT), (minimap_dim_surface, MINIMAP_DIM_LUT)):
+        pixel_colors = color_lut[pixel_tiles]
+        pixel_colors[~pixel_shown] = MINIMAP_BG_COLOR[:3]
+        pixel_rgb = pygame.surfarray.pixels3d(target_surface)
+        pixel_rgb[px0:px1, py0:py1] = pixel_colors.swapaxes(0, 1)
+        del pixel_rgb
+        pixel_alpha = pygame.surfarray.pixels_alpha(target_surface)
+        pixel_alpha[px0:px1, py0:py1] = pixel_alphas
+        del pixel_alpha # Unlocks the surface
+
+def mark_minimap_tiles(tiles):
+    """NEW: Grows the minimap's pending refresh box to cover the given (x, y) tiles."""
+    global minimap_dirty_box
+    xs, ys = zip(*tiles)
+    x0, y0, x1, y1 = min(xs), min(ys), max(xs) + 1, max(ys) + 1
+    if minimap_dirty_box is not None:
+        x0, y0 = min(x0, minimap_dirty_box[0]), min(y0, minimap_dirty_box[1])
+        x1, y1 = max(x1, minimap_dirty_box[2]), max(y1, minimap_dirty_box[3])
+    minimap_dirty_box = (x0, y0, x1, y1)
+
+def draw_minimap(surface, current_time):
+    """NEW: Draws the cached minimap tiles, then the dwarves and camera box on top.
+
+    Both flash phases are cached, so tiles are only re-rendered for a new map or the box
+    of tiles that changed since the last frame (see mark_minimap_tiles).
+    """
+    global minimap_dirty, minimap_dirty_box
+    
+    if minimap_dirty:
+        render_minimap_tiles()
+        minimap_dirty = False
+    elif minimap_dirty_box is not None:
+        render_minimap_tiles(minimap_dirty_box) # Only the tiles that changed
+    minimap_dirty_box = None
+    flash_on = (current_time // 250) % 2 == 0
+    minimap_surface.blit(minimap_bright_surface if flash_on else minimap_dim_surface, (0, 0))
 
     dwarf_w = max(1, int(minimap_pixel_size_x * 2))
     dwarf_h = max(1, int(minimap_pixel_size_y * 2))
@@ -936,9 +1735,20 @@ load_sounds()
 game_map = []
 fog_map = []
 fluid_lifetime_map = []
+fluid_spare_map = None # NEW: update_fluids() writes the next tick into these spares
+fluid_spare_lifetimes = None
+fluid_visited_map = None
+fluid_connected_map = None # NEW: Fluid tiles connected to a source as of the last tick
+fluid_active_map = None # NEW: The fluid frontier: tiles the next tick has to look at
+fluid_frontier_pending = False # NEW: fluid_active_map has at least one tile set
+fluid_reconnect_needed = True # NEW: Fluid was removed, so the next tick re-runs the full step
 arrow_list = []
+arrow_index = {} # NEW: (x, y) -> Arrow, kept in step with arrow_list
 dwarf_list = []
-flood_warnings = []
+dwarf_pool = DwarfPool()
+flood_warnings = FloodWarnings()
+warning_surface_cache = {} # NEW: (radius step, alpha step) -> rendered warning ring
+warning_cache_tile_size = 0 # NEW: Tile size the cached rings were rendered for
 
 gold_count = 0
 chests_found = 0
@@ -958,6 +1768,8 @@ TOTAL_LAVA_POCKETS = 0
 SPAWN_POINT_X = 0
 SPAWN_POINT_Y = 0
 HARD_DIRT_RADIUS = 0
+HARD_DIRT_RADIUS_SQ = 0
+is_hard_ring = None # NEW: (H, W) bool map of tiles outside HARD_DIRT_RADIUS
 
 # NEW: Camera & Input State
 camera_x = 0.0
@@ -968,11 +1780,25 @@ pan_start_x = 0
 pan_start_y = 0
 is_paused = False
 pause_button_rect = None
+last_zoom_change_time = -ZOOM_RESCALE_DELAY # NEW: Sprites/terrain are re-scaled once zooming settles
+
+# NEW: Terrain Cache Globals
+terrain_chunks = {} # (chunk_col, chunk_row) -> that part of the map pre-rendered at terrain_tile_size
+terrain_tile_size = 0
+terrain_chunk_tiles = 1 # Tiles along each side of a chunk
+terrain_grid_tile = None # Grid outline for one tile, None when too small for a grid
+dirty_tiles = set() # (x, y) tiles to re-bake onto their cached chunk
 
 # NEW: Minimap Globals
 minimap_surface = None
 minimap_pixel_size_x = 1
 minimap_pixel_size_y = 1
+minimap_bright_surface = None # Cached tile layers, re-rendered only when tiles change
+minimap_dim_surface = None
+minimap_col_index = None
+minimap_row_index = None
+minimap_dirty = True # Re-render the whole minimap
+minimap_dirty_box = None # (x0, y0, x1, y1) tile range to re-render
 
 # --- Initial Level Setup ---
 setup_level(current_game_level)
@@ -1008,7 +1834,9 @@ while running:
         
         if event.type == pygame.MOUSEWHEEL:
             old_world_x, old_world_y = screen_to_world(mouse_pos[0], mouse_pos[1] - UI_BAR_HEIGHT)
-            zoom_level = max(0.2, min(3.0, zoom_level + event.y * 0.1))
+            # Round so TILE_SIZE * zoom_level is a whole number of pixels
+            zoom_level = round(max(0.2, min(3.0, zoom_level + event.y * 0.1)), 1)
+            last_zoom_change_time = current_time
             new_world_x, new_world_y = screen_to_world(mouse_pos[0], mouse_pos[1] - UI_BAR_HEIGHT)
             
             camera_x -= (new_world_x - old_world_x) * zoom_level
@@ -1050,35 +1878,30 @@ while running:
                 if grid_x != -1:
                     
                     if event.button == 1: # Left Click: Place/Cycle Arrow
-                        existing_arrow = None
-                        for arrow in arrow_list:
-                            if arrow.x == grid_x and arrow.y == grid_y:
-                                existing_arrow = arrow
-                                break
+                        existing_arrow = arrow_index.get((grid_x, grid_y))
                         if existing_arrow:
                             existing_arrow.cycle_direction()
                         else:
                             new_arrow = Arrow(grid_x, grid_y)
                             arrow_list.append(new_arrow)
+                            arrow_index[(grid_x, grid_y)] = new_arrow
                     
                     elif event.button == 3: # Right Click: Wall/Del Arrow
-                        arrow_to_remove = None
-                        for arrow in arrow_list:
-                            if arrow.x == grid_x and arrow.y == grid_y:
-                                arrow_to_remove = arrow
-                                break
+                        arrow_to_remove = arrow_index.pop((grid_x, grid_y), None)
                         
                         if arrow_to_remove:
                             arrow_list.remove(arrow_to_remove)
                         else:
-                            build_target_tile = game_map[grid_y][grid_x]
+                            build_target_tile = game_map[grid_y, grid_x]
                             if (gold_count >= WALL_COST and 
-                                build_target_tile in [TILE_EMPTY, TILE_DIRT, TILE_WATER, TILE_LAVA, TILE_HARD_DIRT, TILE_CRACKED_DIRT] and
-                                fog_map[grid_y][grid_x] == TILE_FOG_REVEALED):
+                                build_target_tile in BUILDABLE_TILES and
+                                fog_map[grid_y, grid_x] == TILE_FOG_REVEALED):
                                 
-                                game_map[grid_y][grid_x] = TILE_WALL
+                                game_map[grid_y, grid_x] = TILE_WALL
+                                dirty_tiles.add((grid_x, grid_y))
+                                wake_fluids(grid_x, grid_y, removed_fluid=build_target_tile in (TILE_WATER, TILE_LAVA))
                                 gold_count -= WALL_COST
-                                fluid_lifetime_map[grid_y][grid_x] = 0
+                                fluid_lifetime_map[grid_y, grid_x] = 0
 
         if event.type == pygame.MOUSEMOTION and is_panning:
             dx = event.pos[0] - pan_start_x
@@ -1106,16 +1929,18 @@ while running:
             game_map, fluid_lifetime_map, new_floods = update_fluids(game_map, fluid_lifetime_map, current_time)
             last_fluid_update_time = current_time
             if new_floods:
-                flood_warnings.extend(new_floods)
+                flood_warnings.add(new_floods)
                 play_sound('warning')
         
         # --- Update all dwarves ---
         new_dwarves_from_loot = []
         trigger_free_upgrade = False
         
+        dwarf_index = build_dwarf_index(dwarf_list)
+        needs_update = dwarf_pool.needs_update(game_map, current_time)
         for dwarf in dwarf_list:
-            if dwarf.alive:
-                reward = dwarf.update(game_map, fog_map, arrow_list, dwarf_list, current_time)
+            if dwarf.alive and needs_update[dwarf.slot]:
+                reward = dwarf.update(game_map, fog_map, arrow_index, dwarf_index, current_time)
                 
                 if reward == 'gold':
                     gold_count += 1
@@ -1153,10 +1978,10 @@ while running:
                         # BUGFIX: Removed flood_warnings.append line
                         
                         adjacent_empty_tiles = []
-                        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0), (-1,-1), (-1,1), (1,-1), (1,1)]:
+                        for dx, dy in NEIGHBORS_8:
                             nx, ny = dwarf.x + dx, dwarf.y + dy
                             if (0 <= nx < MAP_WIDTH) and (0 <= ny < MAP_HEIGHT):
-                                if game_map[ny][nx] == TILE_EMPTY:
+                                if game_map[ny, nx] == TILE_EMPTY:
                                     adjacent_empty_tiles.append((nx, ny))
                         
                         num_to_fill = random.choice([2, 3])
@@ -1164,8 +1989,10 @@ while running:
                         
                         for i in range(min(num_to_fill, len(adjacent_empty_tiles))):
                             fill_x, fill_y = adjacent_empty_tiles[i]
-                            game_map[fill_y][fill_x] = TILE_DIRT
-                            fluid_lifetime_map[fill_y][fill_x] = 0
+                            game_map[fill_y, fill_x] = TILE_DIRT
+                            dirty_tiles.add((fill_x, fill_y))
+                            wake_fluids(fill_x, fill_y)
+                            fluid_lifetime_map[fill_y, fill_x] = 0
 
         dwarf_list.extend(new_dwarves_from_loot)
         
@@ -1173,20 +2000,26 @@ while running:
             current_upgrade_level = perform_upgrade(dwarf_list, current_upgrade_level)
             
         # --- Merge Check ---
-        for i in range(len(dwarf_list)):
-            for j in range(i + 1, len(dwarf_list)):
-                dwarf_a = dwarf_list[i]
-                dwarf_b = dwarf_list[j]
-                
-                if (dwarf_a.alive and dwarf_b.alive and
-                    dwarf_a.x == dwarf_b.x and dwarf_a.y == dwarf_b.y and
-                    dwarf_a.level == dwarf_b.level and dwarf_a.level < MAX_LEVEL):
+        # NEW: Only dwarves sharing a tile can merge, so pair them up per (x, y) bucket
+        shared_tile = dwarf_pool.shared_tile_mask(MAP_WIDTH)
+        merge_index = build_dwarf_index([d for d in dwarf_list if shared_tile[d.slot]]) if shared_tile.any() else {}
+        for tile_dwarves in merge_index.values():
+            for i in range(len(tile_dwarves)):
+                for j in range(i + 1, len(tile_dwarves)):
+                    dwarf_a = tile_dwarves[i]
+                    dwarf_b = tile_dwarves[j]
                     
-                    dwarf_a.set_level(dwarf_a.level + 1)
-                    dwarf_b.alive = False
-                    play_sound('upgrade')
+                    if (dwarf_a.alive and dwarf_b.alive and
+                        dwarf_a.level == dwarf_b.level and dwarf_a.level < MAX_LEVEL):
+                        
+                        dwarf_a.set_level(dwarf_a.level + 1)
+                        dwarf_b.alive = False
+                        play_sound('upgrade')
 
         # --- Cleanup ---
+        for dwarf in dwarf_list:
+            if not dwarf.alive:
+                dwarf_pool.release(dwarf.slot)
         dwarf_list = [d for d in dwarf_list if d.alive]
         
         # --- Check for Game Over ---
@@ -1199,85 +2032,45 @@ while running:
     # --- Drawing ---
     
     screen.fill(COLOR_UI_BACKGROUND)
-    game_area_surface.fill(COLOR_FOG_HIDDEN)
     
-    scale_sprites(zoom_level)
     current_tile_size = int(TILE_SIZE * zoom_level)
+    # NEW: While the wheel is still turning, keep the old sprites and stretch the old terrain
+    zoom_settling = (current_time - last_zoom_change_time <= ZOOM_RESCALE_DELAY and
+                     terrain_tile_size > 0)
+    if not zoom_settling and current_tile_size != previous_zoom_level:
+        scale_sprites(zoom_level)
+    
+    if dirty_tiles:
+        mark_minimap_tiles(dirty_tiles) # Same tile changes show up on the minimap
     
     if current_tile_size > 0:
-        view_world_x_start, view_world_y_start = screen_to_world(0, 0)
-        view_world_x_end, view_world_y_end = screen_to_world(WINDOW_WIDTH, WINDOW_HEIGHT - UI_BAR_HEIGHT)
-
-        tile_col_start = max(0, int(view_world_x_start / TILE_SIZE) - 1)
-        tile_col_end = min(MAP_WIDTH, int(view_world_x_end / TILE_SIZE) + 2)
-        tile_row_start = max(0, int(view_world_y_start / TILE_SIZE) - 1)
-        tile_row_end = min(MAP_HEIGHT, int(view_world_y_end / TILE_SIZE) + 2)
-
-        # --- Draw Layer 1: Base Terrain (Floor) ---
-        for row in range(tile_row_start, tile_row_end):
-            for col in range(tile_col_start, tile_col_end):
-                
-                if fog_map[row][col] == TILE_FOG_REVEALED:
-                    screen_x, screen_y = world_to_screen(col * TILE_SIZE, row * TILE_SIZE)
-                    tile_type = game_map[row][col]
-                    
-                    sprite_to_draw = sprite_cache.get('TILE_EMPTY')
-                    if tile_type == TILE_DIRT:
-                        sprite_to_draw = sprite_cache.get('TILE_DIRT')
-                    elif tile_type == TILE_HARD_DIRT:
-                        sprite_to_draw = sprite_cache.get('TILE_HARD_DIRT')
-                    elif tile_type == TILE_CRACKED_DIRT:
-                        sprite_to_draw = sprite_cache.get('TILE_CRACKED_DIRT')
-                    elif tile_type == TILE_WALL:
-                        sprite_to_draw = sprite_cache.get('TILE_WALL')
-                    elif tile_type == TILE_WATER:
-                        sprite_to_draw = sprite_cache.get('TILE_WATER')
-                    elif tile_type == TILE_LAVA:
-                        sprite_to_draw = sprite_cache.get('TILE_LAVA')
-                    elif tile_type == TILE_WATER_SOURCE:
-                        sprite_to_draw = sprite_cache.get('TILE_WATER_SOURCE')
-                    elif tile_type == TILE_LAVA_SOURCE:
-                        sprite_to_draw = sprite_cache.get('TILE_LAVA_SOURCE')
-                    elif tile_type in [TILE_GOLD, TILE_PRESENT, TILE_CHEST, TILE_UPGRADE_LOOT, TILE_DWARF_LOOT]:
-                        distance = math.sqrt((col - SPAWN_POINT_X)**2 + (row - SPAWN_POINT_Y)**2)
-                        if distance > HARD_DIRT_RADIUS:
-                             sprite_to_draw = sprite_cache.get('TILE_HARD_DIRT')
-                        else:
-                             sprite_to_draw = sprite_cache.get('TILE_DIRT')
-                    
-                    if sprite_to_draw:
-                        game_area_surface.blit(sprite_to_draw, (screen_x, screen_y))
-                    
-                    if current_tile_size > 5:
-                        pygame.draw.rect(game_area_surface, COLOR_GRID, (screen_x, screen_y, current_tile_size, current_tile_size), 1)
-
-        # --- Draw Layer 2: Loot (On top of terrain) ---
-        for row in range(tile_row_start, tile_row_end):
-            for col in range(tile_col_start, tile_col_end):
-                if fog_map[row][col] == TILE_FOG_REVEALED:
-                    tile_type = game_map[row][col]
-                    
-                    sprite_to_draw = None
-                    if tile_type == TILE_GOLD: sprite_to_draw = sprite_cache.get('TILE_GOLD')
-                    elif tile_type == TILE_PRESENT: sprite_to_draw = sprite_cache.get('TILE_PRESENT')
-                    elif tile_type == TILE_CHEST: sprite_to_draw = sprite_cache.get('TILE_CHEST')
-                    elif tile_type == TILE_UPGRADE_LOOT: sprite_to_draw = sprite_cache.get('TILE_UPGRADE_LOOT')
-                    elif tile_type == TILE_DWARF_LOOT: sprite_to_draw = sprite_cache.get('TILE_DWARF_LOOT')
-                    
-                    if sprite_to_draw:
-                        screen_x, screen_y = world_to_screen(col * TILE_SIZE, row * TILE_SIZE)
-                        game_area_surface.blit(sprite_to_draw, (screen_x, screen_y))
+        # --- Draw Layers 1 & 2: Terrain + Loot (Cached) ---
+        if terrain_tile_size != current_tile_size and not zoom_settling:
+            set_terrain_tile_size(current_tile_size)
+        elif dirty_tiles:
+            refresh_dirty_tiles()
+        
+        # Same rounding as world_to_screen(), so dwarves line up with tiles
+        view_x = math.ceil(camera_x)
+        view_y = math.ceil(camera_y)
+        terrain_rect = blit_terrain(game_area_surface, view_x, view_y, current_tile_size)
+        # NEW: The opaque terrain already covers its own rect, so only the off-map border needs clearing
+        fill_outside(game_area_surface, terrain_rect, COLOR_FOG_HIDDEN)
+    else:
+        game_area_surface.fill(COLOR_FOG_HIDDEN)
 
     # --- Draw Layer 3: Dwarves (Drawn outside tile loop) ---
     if current_tile_size > 0:
+        # NEW: Screen positions and the on-screen cull for every pool slot in one pass
+        dwarf_screen_xs, dwarf_screen_ys = world_to_screen_arrays(dwarf_pool.x * TILE_SIZE, dwarf_pool.y * TILE_SIZE)
+        dwarf_on_screen = (dwarf_pool.alive &
+                           (dwarf_screen_xs > -current_tile_size) & (dwarf_screen_xs < WINDOW_WIDTH) &
+                           (dwarf_screen_ys > -current_tile_size) & (dwarf_screen_ys < (WINDOW_HEIGHT - UI_BAR_HEIGHT)))
         for dwarf in dwarf_list:
-            if dwarf.alive:
-                screen_x, screen_y = world_to_screen(dwarf.x * TILE_SIZE, dwarf.y * TILE_SIZE)
-                if screen_x > -current_tile_size and screen_x < WINDOW_WIDTH and \
-                   screen_y > -current_tile_size and screen_y < (WINDOW_HEIGHT - UI_BAR_HEIGHT):
-                    scaled_sprite = sprite_cache.get(dwarf.sprite_key)
-                    if scaled_sprite:
-                        dwarf.draw(game_area_surface, screen_x, screen_y, scaled_sprite)
+            if dwarf_on_screen[dwarf.slot]:
+                scaled_sprite = sprite_cache.get(dwarf.sprite_key)
+                if scaled_sprite:
+                    dwarf.draw(game_area_surface, int(dwarf_screen_xs[dwarf.slot]), int(dwarf_screen_ys[dwarf.slot]), scaled_sprite)
 
     # --- Draw Layer 4: Arrows ---
     if current_tile_size > 0:
@@ -1290,21 +2083,21 @@ while running:
                     arrow.draw(game_area_surface, screen_x, screen_y, scaled_sprite)
                 
     # --- Draw Layer 5: Flood Warnings ---
-    flood_warnings = [w for w in flood_warnings if w[2] > current_time]
-    for (x, y, expiry_time) in flood_warnings:
-        world_x = (x + 0.5) * TILE_SIZE
-        world_y = (y + 0.5) * TILE_SIZE
-        screen_x, screen_y = world_to_screen(world_x, world_y)
-        
+    flood_warnings.expire(current_time)
+    warning_count = len(flood_warnings)
+    warning_xs, warning_ys = world_to_screen_arrays((flood_warnings.x[:warning_count] + 0.5) * TILE_SIZE,
+                                                    (flood_warnings.y[:warning_count] + 0.5) * TILE_SIZE)
+    for screen_x, screen_y, expiry_time in zip(warning_xs.tolist(), warning_ys.tolist(),
+                                               flood_warnings.expiry[:warning_count].tolist()):
         time_left = expiry_time - current_time
         alpha = (time_left / WARNING_DURATION)
         radius = int((1 - alpha) * 3 * TILE_SIZE * zoom_level)
         
         if radius > 0 and (0 < screen_x < WINDOW_WIDTH) and (0 < screen_y < (WINDOW_HEIGHT - UI_BAR_HEIGHT)):
             try:
-                warning_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-                pygame.draw.circle(warning_surface, (255, 0, 0, int(alpha * 200)), (radius, radius), radius, max(1, int(zoom_level * 2)))
-                game_area_surface.blit(warning_surface, (screen_x - radius, screen_y - radius))
+                warning_surface = get_warning_surface(radius, alpha, current_tile_size, max(1, int(zoom_level * 2)))
+                half_size = warning_surface.get_width() // 2
+                game_area_surface.blit(warning_surface, (screen_x - half_size, screen_y - half_size))
             except pygame.error:
                 pass
 